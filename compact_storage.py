@@ -0,0 +1,54 @@
+"""
+compact_storage.py — gộp (compact) JSONL store
+==============================================
+Ghi lại containers/sources/nodes/edges.jsonl của từng user chỉ với bản mới
+nhất còn sống của mỗi ID, thay file bằng atomic rename và dọn deleted_ids.json.
+
+Chạy:
+  python compact_storage.py                 # tất cả user trong data/users/
+  python compact_storage.py --user admin    # một user
+  python compact_storage.py --ratio 0.3     # chỉ gộp khi >= 30% record đã chết
+
+Nên chạy khi server đang dừng, hoặc dùng POST /api/admin/compact khi đang chạy.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from rks.storage import FileStorage
+
+ROOT      = Path(__file__).resolve().parent
+USERS_DIR = ROOT / "data" / "users"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compact per-user JSONL stores")
+    parser.add_argument("--user", help="chỉ gộp store của user này")
+    parser.add_argument("--ratio", type=float, default=0.0,
+                        help="ngưỡng tỉ lệ record chết (0 = luôn gộp)")
+    args = parser.parse_args()
+
+    if args.user:
+        user_dirs = [USERS_DIR / args.user]
+    else:
+        user_dirs = sorted(p for p in USERS_DIR.iterdir() if p.is_dir()) if USERS_DIR.exists() else []
+
+    if not user_dirs:
+        print("Không có store nào để gộp.")
+        return
+
+    for user_dir in user_dirs:
+        storage = FileStorage(data_dir=user_dir)
+        result = storage.maybe_compact(dead_ratio=args.ratio, min_records=0)
+        if result is None:
+            stats = storage.compaction_stats()
+            print(f"  ─ {user_dir.name}: bỏ qua ({stats['dead_records']}/{stats['total_records']} record chết)")
+        else:
+            print(f"  ✓ {user_dir.name}: bỏ {result['removed_records']} record, "
+                  f"còn {result['live_records']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+migrate_to_sharded.py — chuyển store sang layout per-container
+===============================================================
+Tách data/users/{user}/{sources,nodes,edges}.jsonl thành:
+  data/users/{user}/containers/{container_id}/sources.jsonl
+  data/users/{user}/containers/{container_id}/nodes.jsonl
+  data/users/{user}/containers/{container_id}/edges.jsonl
+
+Chỉ copy bản mới nhất còn sống của mỗi ID. File cũ được đổi tên thành
+*.jsonl.migrated — xoá thủ công khi đã verify xong.
+
+Chạy:
+  python migrate_to_sharded.py                # tất cả user
+  python migrate_to_sharded.py --user admin   # một user
+
+An toàn khi chạy nhiều lần — user đã sharded sẽ được bỏ qua.
+Sau khi migrate, đặt STORAGE_LAYOUT=sharded (hoặc để trống: tự nhận diện).
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from rks.storage import FileStorage
+
+ROOT      = Path(__file__).resolve().parent
+USERS_DIR = ROOT / "data" / "users"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate flat JSONL stores to per-container shards")
+    parser.add_argument("--user", help="chỉ migrate store của user này")
+    args = parser.parse_args()
+
+    if args.user:
+        user_dirs = [USERS_DIR / args.user]
+    else:
+        user_dirs = sorted(p for p in USERS_DIR.iterdir() if p.is_dir()) if USERS_DIR.exists() else []
+
+    for user_dir in user_dirs:
+        if (user_dir / "containers").is_dir():
+            print(f"  ✓ {user_dir.name}: đã sharded, giữ nguyên")
+            continue
+        storage = FileStorage(data_dir=user_dir, layout="flat")
+        moved = storage.migrate_to_sharded()
+        summary = ", ".join(f"{k}={v}" for k, v in moved.items()) or "không có dữ liệu"
+        print(f"  ✓ {user_dir.name}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+migrate_to_sqlite.py — import JSONL store vào SQLite
+=====================================================
+Copy toàn bộ record còn sống từ data/users/{user}/*.jsonl (flat hoặc sharded)
+vào data/users/{user}/store.sqlite3.
+
+Chạy:
+  python migrate_to_sqlite.py                # tất cả user
+  python migrate_to_sqlite.py --user admin   # một user
+
+An toàn khi chạy nhiều lần — user đã có store.sqlite3 sẽ được bỏ qua.
+Import vào file tạm rồi mới đổi tên thành store.sqlite3, nên lỗi/crash giữa
+chừng không để lại database dở dang.
+File JSONL giữ nguyên. Sau khi import, đặt STORAGE_BACKEND=sqlite.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from rks.sqlite_storage import SqliteStorage
+from rks.storage import FileStorage
+
+ROOT      = Path(__file__).resolve().parent
+USERS_DIR = ROOT / "data" / "users"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import JSONL stores into SQLite")
+    parser.add_argument("--user", help="chỉ import store của user này")
+    args = parser.parse_args()
+
+    if args.user:
+        user_dirs = [USERS_DIR / args.user]
+    else:
+        user_dirs = sorted(p for p in USERS_DIR.iterdir() if p.is_dir()) if USERS_DIR.exists() else []
+
+    for user_dir in user_dirs:
+        db_path = user_dir / "store.sqlite3"
+        if db_path.exists():
+            print(f"  ✓ {user_dir.name}: đã có {db_path.name}, giữ nguyên")
+            continue
+        counts = SqliteStorage.create_from(db_path, FileStorage(data_dir=user_dir))
+        if counts is None:
+            print(f"  ✓ {user_dir.name}: đã có {db_path.name}, giữ nguyên")
+            continue
+        summary = ", ".join(f"{k}={v}" for k, v in counts.items())
+        print(f"  ✓ {user_dir.name}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import json
-import os
 import re
+from collections.abc import AsyncIterator
+from concurrent.futures import Executor
 
+from . import llm
+from .jsonstream import JsonStreamScanner
+from .singleflight import SingleFlight
 from .models import (
     EdgeCreate,
     ExploreRequest,
@@ -17,25 +23,23 @@ from .models import (
     ResponseBlock,
     SuggestedNode,
 )
-from .storage import FileStorage
+from .storage import AbstractStorage
 
 
 class CognitiveAgent:
-    def __init__(self, storage: FileStorage):
+    """explore / auto_document_node là coroutine: lời gọi LLM được await trên
+    client dùng chung (rks.llm), còn phần đọc/ghi storage đồng bộ chạy trên
+    ``io_executor`` (None = executor mặc định của event loop)."""
+
+    def __init__(self, storage: AbstractStorage, io_executor: Executor | None = None):
         self.storage = storage
-        self._llm_client = None
+        self._io_executor = io_executor
         self._model = "gpt-4o-mini"
-        self._init_llm()
+        self._auto_documenting = SingleFlight()     # node_id → lần auto-document đang chạy
 
-    def _init_llm(self) -> None:
-        """Khởi tạo LLM client nếu có API key."""
-        api_key = os.getenv("OPENAI_API_KEY", "")
-        if api_key:
-            try:
-                from openai import OpenAI
-                self._llm_client = OpenAI(api_key=api_key)
-            except ImportError:
-                pass
+    async def _offload(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, functools.partial(fn, *args))
 
     # ── Node maturity ──────────────────────────────────────────────────────
 
@@ -46,9 +50,7 @@ class CognitiveAgent:
         if node.boundary_conditions.strip(): score += 1
         if len(node.assumptions) >= 1:       score += 1
         # Check if it has ≥3 edges
-        edges = self.storage.list_edges(node.container_id)
-        connected = [e for e in edges if e.source_node_id == node.node_id or e.target_node_id == node.node_id]
-        if len(connected) >= 3:              score = max(score, 3)
+        if self.storage.edge_count(node.node_id) >= 3: score = max(score, 3)
         return score
 
     def can_activate(self, node: GraphNode) -> tuple[bool, list[str]]:
@@ -105,41 +107,79 @@ class CognitiveAgent:
 
     # ── Explore (AI chat) ──────────────────────────────────────────────────
 
-    def explore(self, req: ExploreRequest) -> ExploreResponse:
-        node = self.storage.get_node(req.node_id)
+    async def explore(self, req: ExploreRequest, use_cache: bool = True) -> ExploreResponse:
+        node = await self._offload(self.storage.get_node, req.node_id)
         if node is None:
             return ExploreResponse(reply="Node không tồn tại.")
 
-        if self._llm_client:
+        if llm.client():
             # Build graph context for richer prompt
-            graph_ctx = self._build_graph_context(node)
-            return self._explore_with_llm(req, node, graph_ctx)
+            graph_ctx = await self._offload(self._build_graph_context, node)
+            return await self._explore_with_llm(req, node, graph_ctx, use_cache)
         else:
             return self._explore_mock(req, node)
 
+    async def explore_stream(self, req: ExploreRequest, use_cache: bool = True) -> AsyncIterator[tuple[str, dict]]:
+        """Như explore nhưng trả dần (event, data) ngay khi LLM sinh ra:
+        "token" {text} cho mỗi delta; ở clarify mode thêm "summary" {summary}
+        và "block" (một ResponseBlock) ngay khi object JSON đó đóng ngoặc;
+        cuối cùng luôn là "done" với ExploreResponse đầy đủ."""
+        node = await self._offload(self.storage.get_node, req.node_id)
+        if node is None:
+            yield "done", ExploreResponse(reply="Node không tồn tại.").model_dump(mode="json")
+            return
+        if not llm.client():
+            yield "done", self._explore_mock(req, node).model_dump(mode="json")
+            return
+
+        graph_ctx = await self._offload(self._build_graph_context, node)
+        scanner = JsonStreamScanner() if req.mode == "clarify" else None
+        parts: list[str] = []
+        try:
+            async for delta in llm.chat_stream(
+                use_cache,
+                model=self._model,
+                messages=self._explore_messages(req, node, graph_ctx),
+                temperature=0.7,
+                max_tokens=2500,
+            ):
+                parts.append(delta)
+                yield "token", {"text": delta}
+                for path, value in (scanner.feed(delta) if scanner else ()):
+                    if path == ("summary",) and isinstance(value, str):
+                        yield "summary", {"summary": value}
+                    elif len(path) == 2 and path[0] == "blocks" and isinstance(value, dict):
+                        try:
+                            block = self._response_block(value, path[1])
+                        except ValueError:
+                            continue            # invalid block — the final parse decides
+                        yield "block", block.model_dump(mode="json")
+        except Exception as e:
+            yield "done", ExploreResponse(reply=f"Lỗi LLM: {e}").model_dump(mode="json")
+            return
+        yield "done", self._explore_result(req.mode, "".join(parts)).model_dump(mode="json")
+
     def _build_graph_context(self, node: GraphNode) -> dict:
         """Gather container info + neighboring nodes + edge relations."""
         container = self.storage.get_container(node.container_id)
-        edges = self.storage.list_edges(node.container_id)
-        all_nodes = self.storage.list_nodes(node.container_id)
-        node_map = {n.node_id: n for n in all_nodes}
 
         neighbors = []
-        for e in edges:
+        for e in self.storage.list_edges_for_node(node.node_id):
+            if len(neighbors) >= 8:  # cap at 8
+                break
             if e.source_node_id == node.node_id:
-                nb = node_map.get(e.target_node_id)
+                nb = self.storage.get_node(e.target_node_id)
                 if nb:
                     neighbors.append({"title": nb.title, "relation": f"{e.relation_type} →", "definition": nb.definition[:120] if nb.definition else ""})
-            elif e.target_node_id == node.node_id:
-                nb = node_map.get(e.source_node_id)
+            else:
+                nb = self.storage.get_node(e.source_node_id)
                 if nb:
                     neighbors.append({"title": nb.title, "relation": f"← {e.relation_type}", "definition": nb.definition[:120] if nb.definition else ""})
 
         return {
             "container_title": container.title if container else "",
             "container_description": container.description if container else "",
-            "neighbors": neighbors[:8],  # cap at 8
-            "total_nodes": len(all_nodes),
+            "neighbors": neighbors,
         }
 
     def _build_system_prompt(self, node: GraphNode, mode: str, graph_ctx: dict | None = None) -> str:
@@ -209,69 +249,80 @@ Sau câu trả lời, thêm JSON block theo đúng format:
 ]
 ```"""
 
-    def _explore_with_llm(self, req: ExploreRequest, node: GraphNode, graph_ctx: dict | None = None) -> ExploreResponse:
+    def _explore_messages(self, req: ExploreRequest, node: GraphNode, graph_ctx: dict | None = None) -> list[dict]:
         messages = [{"role": "system", "content": self._build_system_prompt(node, req.mode, graph_ctx)}]
         for m in req.history[-6:]:  # max 6 turns context
             messages.append({"role": m.role, "content": m.content})
         messages.append({"role": "user", "content": req.message})
+        return messages
 
+    async def _explore_with_llm(self, req: ExploreRequest, node: GraphNode, graph_ctx: dict | None = None,
+                                use_cache: bool = True) -> ExploreResponse:
         try:
-            resp = self._llm_client.chat.completions.create(
+            reply = await llm.complete(
+                use_cache,
                 model=self._model,
-                messages=messages,
+                messages=self._explore_messages(req, node, graph_ctx),
                 temperature=0.7,
                 max_tokens=2500,
             )
-            reply = resp.choices[0].message.content or ""
-
-            if req.mode == "clarify":
-                # Try to parse structured JSON response
-                try:
-                    raw = re.sub(r"```json|```", "", reply).strip()
-                    data = json.loads(raw)
-                    if "blocks" in data:
-                        blocks = [
-                            ResponseBlock(
-                                id=b.get("id", f"b{i}"),
-                                type=b.get("type", "definition"),
-                                title=b.get("title", ""),
-                                content=b.get("content", []),
-                                relations=b.get("relations", {}),
-                            )
-                            for i, b in enumerate(data["blocks"])
-                        ]
-                        return ExploreResponse(
-                            reply=data.get("summary", ""),
-                            blocks=blocks,
-                        )
-                except Exception:
-                    pass
-                return ExploreResponse(reply=reply)
-
-            # expand mode
-            suggested = self._parse_suggested_nodes(reply)
-            clean_reply = re.sub(r"```json.*?```", "", reply, flags=re.DOTALL).strip()
-            return ExploreResponse(reply=clean_reply, suggested_nodes=suggested)
+            return self._explore_result(req.mode, reply)
         except Exception as e:
             return ExploreResponse(reply=f"Lỗi LLM: {e}")
 
+    @staticmethod
+    def _response_block(b: dict, i: int) -> ResponseBlock:
+        return ResponseBlock(
+            id=b.get("id", f"b{i}"),
+            type=b.get("type", "definition"),
+            title=b.get("title", ""),
+            content=b.get("content", []),
+            relations=b.get("relations", {}),
+        )
+
+    def _explore_result(self, mode: str, reply: str) -> ExploreResponse:
+        if mode == "clarify":
+            # Try to parse structured JSON response
+            try:
+                raw = re.sub(r"```json|```", "", reply).strip()
+                data = json.loads(raw)
+                if "blocks" in data:
+                    blocks = [self._response_block(b, i) for i, b in enumerate(data["blocks"])]
+                    return ExploreResponse(
+                        reply=data.get("summary", ""),
+                        blocks=blocks,
+                    )
+            except Exception:
+                pass
+            return ExploreResponse(reply=reply)
+
+        # expand mode
+        suggested = self._parse_suggested_nodes(reply)
+        clean_reply = re.sub(r"```json.*?```", "", reply, flags=re.DOTALL).strip()
+        return ExploreResponse(reply=clean_reply, suggested_nodes=suggested)
+
     # ── Auto-Document (AI fills definition/mechanism/boundary + suggests nodes) ──
 
-    def auto_document_node(self, node_id: str) -> dict:
+    async def auto_document_node(self, node_id: str, use_cache: bool = True) -> dict:
         """
         Tự động điền Document fields + đề xuất related nodes bằng LLM.
         Trả về { node, suggested_nodes }.
+        Lời gọi cho node đang được auto-document (double-click, nhiều tab)
+        nhận chung kết quả lần đang chạy — chỉ một lần gọi LLM và một version.
         """
-        node = self.storage.get_node(node_id)
+        return await self._auto_documenting.run(node_id, lambda: self._auto_document(node_id, use_cache))
+
+    async def _auto_document(self, node_id: str, use_cache: bool) -> dict:
+        node = await self._offload(self.storage.get_node, node_id)
         if node is None:
             raise KeyError(f"Node not found: {node_id}")
 
-        if self._llm_client:
-            return self._auto_document_with_llm(node)
+        if llm.client():
+            return await self._auto_document_with_llm(node, use_cache)
         else:
-            return self._auto_document_mock(node)
+            return await self._offload(self._auto_document_mock, node)
 
-    def _auto_document_with_llm(self, node: GraphNode) -> dict:
+    async def _auto_document_with_llm(self, node: GraphNode, use_cache: bool = True) -> dict:
         relation_types = [r.value for r in RelationType]
         node_types     = [t.value for t in NodeType]
         prompt = f"""Bạn là chuyên gia tri thức. Hãy tạo tài liệu chi tiết cho khái niệm sau:
@@ -299,18 +350,20 @@ Trả lời theo JSON sau (CHỈ JSON, không thêm text):
 }}"""
 
         try:
-            resp = self._llm_client.chat.completions.create(
+            raw = await llm.complete(
+                use_cache,
                 model=self._model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
                 max_tokens=1200,
                 response_format={"type": "json_object"},
             )
-            raw = resp.choices[0].message.content or "{}"
-            data = json.loads(raw)
+            data = json.loads(raw or "{}")
         except Exception as e:
-            return self._auto_document_mock(node, error=str(e))
+            return await self._offload(self._auto_document_mock, node, str(e))
+        return await self._offload(self._apply_auto_document, node, data)
 
+    def _apply_auto_document(self, node: GraphNode, data: dict) -> dict:
         # Apply parsed fields to node
         if data.get("definition"):        node.definition          = data["definition"]
         if data.get("mechanism"):         node.mechanism           = data["mechanism"]
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from concurrent.futures import Executor
+
+from .models import GraphEdge, GraphNode, KnowledgeContainer, Source
+from .storage import AbstractStorage
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# AsyncAbstractStorage — awaitable counterpart of AbstractStorage
+# Route async gọi storage qua interface này để I/O không chặn event loop;
+# backend async thật (asyncpg, Phase 3) implement trực tiếp, còn backend
+# đồng bộ hiện có thì bọc bằng ExecutorStorage.
+# ─────────────────────────────────────────────────────────────────────────────
+
+class AsyncAbstractStorage(ABC):
+    # Containers
+    @abstractmethod
+    async def list_containers(self) -> list[KnowledgeContainer]: ...
+    @abstractmethod
+    async def get_container(self, container_id: str) -> KnowledgeContainer | None: ...
+    @abstractmethod
+    async def upsert_container(self, c: KnowledgeContainer) -> None: ...
+    @abstractmethod
+    async def delete_container(self, container_id: str) -> None: ...
+
+    # Sources
+    @abstractmethod
+    async def list_sources(self, container_id: str) -> list[Source]: ...
+    @abstractmethod
+    async def upsert_source(self, s: Source) -> None: ...
+    @abstractmethod
+    async def delete_source(self, source_id: str) -> None: ...
+
+    # Nodes
+    @abstractmethod
+    async def list_nodes(self, container_id: str) -> list[GraphNode]: ...
+    @abstractmethod
+    async def get_node(self, node_id: str) -> GraphNode | None: ...
+    @abstractmethod
+    async def upsert_node(self, node: GraphNode) -> None: ...
+    @abstractmethod
+    async def delete_node(self, node_id: str) -> None: ...
+    @abstractmethod
+    async def delete_node_cascade(self, node_id: str) -> tuple[list[str], list[str]]:
+        """Returns (deleted node_ids, deleted edge_ids)."""
+
+    # Edges
+    @abstractmethod
+    async def list_edges(self, container_id: str) -> list[GraphEdge]: ...
+    @abstractmethod
+    async def get_edge(self, edge_id: str) -> GraphEdge | None: ...
+    @abstractmethod
+    async def upsert_edge(self, edge: GraphEdge) -> None: ...
+    @abstractmethod
+    async def delete_edge(self, edge_id: str) -> None: ...
+    @abstractmethod
+    async def list_edges_for_node(self, node_id: str, direction: str = "both") -> list[GraphEdge]:
+        """Edges touching one node.  direction: "out" | "in" | "both"."""
+    @abstractmethod
+    async def edge_count(self, node_id: str) -> int: ...
+
+    # Change feed
+    @abstractmethod
+    async def container_revision(self, container_id: str,
+                                 kinds: tuple[str, ...] = ("node", "edge")) -> int: ...
+    @abstractmethod
+    async def store_revision(self) -> int: ...
+    @abstractmethod
+    async def changes_since(self, container_id: str, since: int) -> dict | None: ...
+    @abstractmethod
+    async def container_of(self, entity_id: str) -> str | None: ...
+
+    # Listeners are called from whichever thread committed the write, so
+    # they stay synchronous; see AbstractStorage.add_change_listener.
+    @abstractmethod
+    def add_change_listener(self, listener: Callable[[str, int], None]) -> None: ...
+    @abstractmethod
+    def remove_change_listener(self, listener: Callable[[str, int], None]) -> None: ...
+
+    # Raw rows
+    @abstractmethod
+    async def list_node_rows(self, container_id: str) -> list[dict]: ...
+    @abstractmethod
+    async def list_edge_rows(self, container_id: str) -> list[dict]: ...
+
+    # Bulk
+    @abstractmethod
+    async def upsert_many(self, nodes: list[GraphNode] = (), edges: list[GraphEdge] = (),
+                          sources: list[Source] = ()) -> None: ...
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ExecutorStorage — chạy AbstractStorage đồng bộ trên một executor riêng
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ExecutorStorage(AsyncAbstractStorage):
+    """Adapter that runs each call of a synchronous ``AbstractStorage`` on
+    ``executor``.
+
+    Give it a bounded pool dedicated to storage I/O: blocking file reads then
+    queue there instead of occupying the event loop or the threadpool that
+    serves the remaining sync routes.  The adapter is stateless and cheap, so
+    one can be built per request around the registry's cached storage.
+    """
+
+    def __init__(self, storage: AbstractStorage, executor: Executor):
+        self.sync = storage
+        self._executor = executor
+
+    async def _call(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    # Containers
+    async def list_containers(self) -> list[KnowledgeContainer]:
+        return await self._call(self.sync.list_containers)
+
+    async def get_container(self, container_id: str) -> KnowledgeContainer | None:
+        return await self._call(self.sync.get_container, container_id)
+
+    async def upsert_container(self, c: KnowledgeContainer) -> None:
+        await self._call(self.sync.upsert_container, c)
+
+    async def delete_container(self, container_id: str) -> None:
+        await self._call(self.sync.delete_container, container_id)
+
+    # Sources
+    async def list_sources(self, container_id: str) -> list[Source]:
+        return await self._call(self.sync.list_sources, container_id)
+
+    async def upsert_source(self, s: Source) -> None:
+        await self._call(self.sync.upsert_source, s)
+
+    async def delete_source(self, source_id: str) -> None:
+        await self._call(self.sync.delete_source, source_id)
+
+    # Nodes
+    async def list_nodes(self, container_id: str) -> list[GraphNode]:
+        return await self._call(self.sync.list_nodes, container_id)
+
+    async def get_node(self, node_id: str) -> GraphNode | None:
+        return await self._call(self.sync.get_node, node_id)
+
+    async def upsert_node(self, node: GraphNode) -> None:
+        await self._call(self.sync.upsert_node, node)
+
+    async def delete_node(self, node_id: str) -> None:
+        await self._call(self.sync.delete_node, node_id)
+
+    async def delete_node_cascade(self, node_id: str) -> tuple[list[str], list[str]]:
+        return await self._call(self.sync.delete_node_cascade, node_id)
+
+    # Edges
+    async def list_edges(self, container_id: str) -> list[GraphEdge]:
+        return await self._call(self.sync.list_edges, container_id)
+
+    async def get_edge(self, edge_id: str) -> GraphEdge | None:
+        return await self._call(self.sync.get_edge, edge_id)
+
+    async def upsert_edge(self, edge: GraphEdge) -> None:
+        await self._call(self.sync.upsert_edge, edge)
+
+    async def delete_edge(self, edge_id: str) -> None:
+        await self._call(self.sync.delete_edge, edge_id)
+
+    async def list_edges_for_node(self, node_id: str, direction: str = "both") -> list[GraphEdge]:
+        return await self._call(self.sync.list_edges_for_node, node_id, direction)
+
+    async def edge_count(self, node_id: str) -> int:
+        return await self._call(self.sync.edge_count, node_id)
+
+    # Change feed
+    async def container_revision(self, container_id: str,
+                                 kinds: tuple[str, ...] = ("node", "edge")) -> int:
+        return await self._call(self.sync.container_revision, container_id, kinds)
+
+    async def store_revision(self) -> int:
+        return await self._call(self.sync.store_revision)
+
+    async def changes_since(self, container_id: str, since: int) -> dict | None:
+        return await self._call(self.sync.changes_since, container_id, since)
+
+    async def container_of(self, entity_id: str) -> str | None:
+        return await self._call(self.sync.container_of, entity_id)
+
+    def add_change_listener(self, listener: Callable[[str, int], None]) -> None:
+        self.sync.add_change_listener(listener)
+
+    def remove_change_listener(self, listener: Callable[[str, int], None]) -> None:
+        self.sync.remove_change_listener(listener)
+
+    # Raw rows
+    async def list_node_rows(self, container_id: str) -> list[dict]:
+        return await self._call(self.sync.list_node_rows, container_id)
+
+    async def list_edge_rows(self, container_id: str) -> list[dict]:
+        return await self._call(self.sync.list_edge_rows, container_id)
+
+    # Bulk
+    async def upsert_many(self, nodes: list[GraphNode] = (), edges: list[GraphEdge] = (),
+                          sources: list[Source] = ()) -> None:
+        await self._call(self.sync.upsert_many, nodes, edges, sources)
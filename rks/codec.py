@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+# ─────────────────────────────────────────────────────────────────────────────
+# JSON codec — dùng orjson hoặc msgspec nếu đã cài, fallback về stdlib json.
+# Mọi chỗ đọc/ghi JSONL và các response lớn (graph, list) đi qua đây.
+# ─────────────────────────────────────────────────────────────────────────────
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for types the encoder doesn't know: pydantic models are dumped
+    in JSON mode, anything else becomes its ``str()``."""
+    model_dump = getattr(obj, "model_dump", None)
+    if model_dump is not None:
+        return model_dump(mode="json")
+    return str(obj)
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default)
+
+    def loads(data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+elif msgspec is not None:
+    BACKEND = "msgspec"
+    _encoder = msgspec.json.Encoder(enc_hook=_default)
+    _decoder = msgspec.json.Decoder()
+
+    def dumps(obj: Any) -> bytes:
+        return _encoder.encode(obj)
+
+    def loads(data: bytes | str) -> Any:
+        try:
+            return _decoder.decode(data)
+        except msgspec.DecodeError as e:       # keep ValueError, as json/orjson do
+            raise ValueError(str(e)) from e
+
+else:
+    BACKEND = "json"
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, default=_default).encode("utf-8")
+
+    def loads(data: bytes | str) -> Any:
+        return json.loads(data)
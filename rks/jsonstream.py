@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class _Frame:
+    __slots__ = ("kind", "start", "key", "expect_key", "index")
+
+    def __init__(self, kind: str, start: int):
+        self.kind = kind            # "{" | "["
+        self.start = start
+        self.key = None             # objects: key of the member being read
+        self.expect_key = True
+        self.index = 0              # arrays: position of the element being read
+
+
+class JsonStreamScanner:
+    """Incremental scanner for one JSON object that arrives in chunks (an LLM
+    completion being streamed).
+
+    ``feed(chunk)`` returns the values completed by that chunk as
+    ``(path, value)`` pairs, shallow levels only:
+
+    * ``(key,)``        — a member of the top-level object;
+    * ``(key, index)``  — an element of a top-level array member, emitted as
+      soon as that element closes, before the array itself is complete.
+
+    Text before the first ``{`` (e.g. a ```json fence) and after the object
+    closes is ignored.  Each completed value is decoded on its own, so the
+    cost stays linear in the length of the stream.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack: list[_Frame] = []
+        self._in_str = False
+        self._escape = False
+        self._str_start = 0
+        self._scalar_start = -1
+        self.done = False
+
+    def feed(self, chunk: str) -> list[tuple[tuple, object]]:
+        if self.done or not chunk:
+            return []
+        self._text += chunk
+        out: list[tuple[tuple, object]] = []
+        text = self._text
+        stack = self._stack
+        i = self._pos
+        n = len(text)
+        while i < n and not self.done:
+            c = text[i]
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_str = False
+                    self._string_end(self._str_start, i, out)
+            elif not stack:
+                if c == "{":
+                    stack.append(_Frame("{", i))
+            elif c == '"':
+                self._in_str = True
+                self._str_start = i
+            elif c in "{[":
+                stack.append(_Frame(c, i))
+            elif c in "}],":
+                if self._scalar_start >= 0:
+                    self._value_end(self._scalar_start, i, out)
+                    self._scalar_start = -1
+                if c == ",":
+                    top = stack[-1]
+                    if top.kind == "{":
+                        top.expect_key, top.key = True, None
+                    else:
+                        top.index += 1
+                else:
+                    frame = stack.pop()
+                    if not stack:
+                        self.done = True
+                    self._value_end(frame.start, i + 1, out)
+            elif c == ":":
+                stack[-1].expect_key = False
+            elif c in _WHITESPACE:
+                if self._scalar_start >= 0:
+                    self._value_end(self._scalar_start, i, out)
+                    self._scalar_start = -1
+            elif self._scalar_start < 0:
+                self._scalar_start = i          # number / true / false / null
+            i += 1
+        self._pos = i
+        return out
+
+    def _string_end(self, start: int, end: int, out: list) -> None:
+        top = self._stack[-1]
+        if top.kind == "{" and top.expect_key:
+            top.key = json.loads(self._text[start:end + 1])
+        else:
+            self._value_end(start, end + 1, out)
+
+    def _value_end(self, start: int, stop: int, out: list) -> None:
+        stack = self._stack
+        if not stack or stack[0].kind != "{" or len(stack) > 2:
+            return
+        if len(stack) == 1:
+            path = (stack[0].key,)
+        elif stack[1].kind == "[":
+            path = (stack[0].key, stack[1].index)
+        else:
+            return
+        try:
+            out.append((path, json.loads(self._text[start:stop])))
+        except ValueError:
+            pass                                # malformed member — the final parse decides
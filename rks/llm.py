@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+
+from .llm_cache import ResponseCache
+from .singleflight import SingleFlight
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Shared AsyncOpenAI client
+# Một client cho cả process thay vì mỗi agent một client: pool httpx giữ kết
+# nối keep-alive tới API nên lời gọi sau không phải bắt tay TCP/TLS lại.
+# OPENAI_BASE_URL (SDK tự đọc) trỏ sang server khác — vd stub khi test.
+# ─────────────────────────────────────────────────────────────────────────────
+
+_client = None
+_slots: asyncio.Semaphore | None = None
+_lock = threading.Lock()
+_cache: ResponseCache | None = None
+_flights = SingleFlight()
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, "").strip() or default)
+
+
+def _build_client(api_key: str):
+    try:
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+    except ImportError:
+        return None
+    timeout = httpx.Timeout(_env_float("LLM_TIMEOUT_SECONDS", 60),
+                            connect=_env_float("LLM_CONNECT_TIMEOUT_SECONDS", 5))
+    limits = httpx.Limits(
+        max_connections=int(_env_float("LLM_MAX_CONNECTIONS", 20)),
+        max_keepalive_connections=int(_env_float("LLM_MAX_CONNECTIONS", 20)),
+        keepalive_expiry=_env_float("LLM_KEEPALIVE_SECONDS", 60),
+    )
+    return AsyncOpenAI(
+        api_key=api_key,
+        timeout=timeout,
+        max_retries=int(_env_float("LLM_MAX_RETRIES", 2)),
+        http_client=DefaultAsyncHttpxClient(timeout=timeout, limits=limits),
+    )
+
+
+def client():
+    """The process-wide AsyncOpenAI client, or None when OPENAI_API_KEY is
+    unset or the openai SDK is not installed (callers fall back to demo
+    replies)."""
+    global _client
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY", "")
+        if not api_key:
+            return None
+        with _lock:
+            if _client is None:
+                _client = _build_client(api_key)
+    return _client
+
+
+def _concurrency() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(max(1, int(_env_float("LLM_MAX_CONCURRENCY", 8))))
+    return _slots
+
+
+# ── Response cache ─────────────────────────────────────────────────
+# Tuỳ chọn: app gọi set_cache() lúc khởi động.  Chỉ lưu completion kết thúc
+# bình thường (finish_reason "stop"), không lưu câu trả lời bị cắt / lỗi.
+
+def set_cache(cache: ResponseCache | None) -> None:
+    global _cache
+    _cache = cache
+
+
+def cache_stats() -> dict | None:
+    return _cache.stats() if _cache is not None else None
+
+
+def inflight_stats() -> dict:
+    return _flights.stats()
+
+
+async def _cached(key: str, use_cache: bool) -> str | None:
+    if _cache is None or not use_cache:
+        return None
+    return await asyncio.to_thread(_cache.get, key)
+
+
+async def _store(key: str, text: str, finish_reason: str | None, use_cache: bool) -> None:
+    if _cache is not None and use_cache and finish_reason == "stop":
+        await asyncio.to_thread(_cache.put, key, text)
+
+
+# ── Completions ────────────────────────────────────────────────────
+# Tối đa LLM_MAX_CONCURRENCY request tới API cùng lúc, phần dư chờ lượt.
+# Single-flight: request giống hệt (cùng cache key) đang chạy thì lời gọi
+# sau chờ chung kết quả thay vì gọi API lần nữa (double-click, nhiều tab).
+
+async def complete(use_cache: bool = True, **params) -> str:
+    """Text of one ``chat.completions.create`` on the shared client, served
+    from the response cache when the identical request was answered before,
+    or shared with an identical request still in flight."""
+    key = ResponseCache.key(params)
+    text = await _cached(key, use_cache)
+    if text is not None:
+        return text
+    return await _flights.run(key, lambda: _fetch(key, params, use_cache))
+
+
+async def _fetch(key: str, params: dict, use_cache: bool) -> str:
+    async with _concurrency():
+        resp = await client().chat.completions.create(**params)
+    choice = resp.choices[0]
+    text = choice.message.content or ""
+    await _store(key, text, choice.finish_reason, use_cache)
+    return text
+
+
+async def chat_stream(use_cache: bool = True, **params):
+    """Streaming ``complete``: yields the text deltas as they arrive.  A cache
+    hit, or joining an identical request already in flight, is one delta.
+    The upstream stream runs as its own task, so it completes (and is cached)
+    even if this consumer stops iterating."""
+    key = ResponseCache.key(params)
+    text = await _cached(key, use_cache)
+    if text is None and (running := _flights.join(key)) is not None:
+        text = await running
+    if text is not None:
+        yield text
+        return
+    deltas: asyncio.Queue[str | None] = asyncio.Queue()
+    flight = _flights.run(key, lambda: _fetch_stream(key, params, use_cache, deltas.put_nowait))
+    while (delta := await deltas.get()) is not None:
+        yield delta
+    await flight                                # re-raises an upstream error
+
+
+async def _fetch_stream(key: str, params: dict, use_cache: bool, emit) -> str:
+    parts: list[str] = []
+    finish_reason = None
+    try:
+        async with _concurrency():
+            stream = await client().chat.completions.create(stream=True, **params)
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    if choice.delta.content:
+                        parts.append(choice.delta.content)
+                        emit(choice.delta.content)
+            finally:
+                await stream.close()
+    finally:
+        emit(None)
+    text = "".join(parts)
+    await _store(key, text, finish_reason, use_cache)
+    return text
+
+
+async def aclose() -> None:
+    """Close the pooled connections (app shutdown).  The next ``client()``
+    call builds a fresh client."""
+    global _client, _slots
+    current, _client, _slots = _client, None, None
+    if current is not None:
+        await current.close()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ResponseCache — content-addressed cache of LLM completions (SQLite, WAL)
+# Key = hash(model + messages đã render + tham số sampling), nên cùng node,
+# cùng neighbors, cùng mode/câu hỏi → trả lại câu trả lời cũ, không gọi API.
+# ─────────────────────────────────────────────────────────────────────────────
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key            TEXT PRIMARY KEY,
+    created_at     REAL NOT NULL,
+    accessed_at    REAL NOT NULL,
+    size           INTEGER NOT NULL,
+    body           TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_created  ON responses(created_at);
+CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses(accessed_at);
+"""
+
+
+class ResponseCache:
+    """Completion texts keyed by the request that produced them.
+
+    Entries older than ``ttl`` seconds are misses and get purged; when the
+    stored bodies exceed ``max_bytes`` the least recently read ones are
+    evicted.  One connection per thread, like SqliteStorage, so several
+    worker processes can share the file.
+    """
+
+    def __init__(self, db_path: Path, ttl: float = 7 * 86400, max_bytes: int = 64 * 1024 * 1024):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._path = db_path
+        self._ttl = ttl
+        self._max_bytes = max(0, max_bytes)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += n
+
+    @staticmethod
+    def key(params: dict) -> str:
+        """Hash of the full request (model, messages, sampling parameters)."""
+        canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT body, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None and now - row[1] > self._ttl:
+            with conn:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count("expired")
+            row = None
+        if row is None:
+            self._count("misses")
+            return None
+        with conn:
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return row[0]
+
+    def put(self, key: str, body: str) -> None:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, created_at, accessed_at, size, body) VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, len(body.encode("utf-8")), body),
+            )
+            expired = conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self._ttl,)).rowcount
+        self._count("stores")
+        if expired:
+            self._count("expired", expired)
+        self._evict_over_budget()
+
+    def _evict_over_budget(self) -> None:
+        if self._max_bytes <= 0:
+            return
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self._max_bytes:
+            return
+        # Trim to 90% so a full cache does not evict on every store
+        excess = total - int(self._max_bytes * 0.9)
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        with conn:
+            conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._count("evictions", len(victims))
+
+    def stats(self) -> dict:
+        entries, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts["hits"] + counts["misses"]
+        return {**counts,
+                "hit_ratio": round(counts["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": entries, "bytes": size,
+                "ttl_seconds": self._ttl, "max_bytes": self._max_bytes}
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Executor
+from pathlib import Path
+
+from .agent import CognitiveAgent
+from .sqlite_storage import SqliteStorage
+from .storage import AbstractStorage, FileStorage
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# UserRegistry — process-wide cache of per-user storage + agent
+# Giữ storage (và index đã nạp) + CognitiveAgent (và LLM client) sống
+# giữa các request thay vì dựng lại mỗi lần.
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _UserEntry:
+    __slots__ = ("storage", "agent", "last_used", "pins")
+
+    def __init__(self, storage: AbstractStorage, agent: CognitiveAgent, last_used: float):
+        self.storage = storage
+        self.agent = agent
+        self.last_used = last_used
+        self.pins = 0                          # live change subscriptions (SSE)
+
+
+class UserRegistry:
+    """Bounded LRU of warm (storage, agent) pairs keyed by username.
+
+    Entries idle for longer than ``idle_ttl`` seconds are dropped on the next
+    lookup; when more than ``max_users`` are resident the least recently used
+    one is evicted.  With ``max_bytes`` > 0, least recently used entries are
+    also evicted while the stores' summed ``memory_estimate()`` exceeds it
+    (the user being served is always kept).  Entries with change
+    subscribers (``subscribe``) are never evicted.
+
+    ``backend`` is "file" (JSONL FileStorage) or "sqlite"; a new SQLite store
+    imports the user's existing JSONL data on first open (atomically, see
+    ``SqliteStorage.create_from``).  Stores are opened under a per-user lock,
+    so a slow open does not hold up other users.  Agents offload
+    their storage I/O to ``io_executor``.  Extra keyword arguments (layout,
+    durability, ...) are passed on to FileStorage.
+    """
+
+    def __init__(self, data_base: Path, max_users: int = 32, idle_ttl: float = 1800.0,
+                 backend: str = "file", max_bytes: int = 0,
+                 io_executor: Executor | None = None, **file_options):
+        if backend not in ("file", "sqlite"):
+            raise ValueError(f"Unknown storage backend: {backend}")
+        self._data_base = data_base
+        self._backend = backend
+        self._file_options = file_options
+        self._io_executor = io_executor
+        self._max_users = max(1, max_users)
+        self._idle_ttl = idle_ttl
+        self._max_bytes = max(0, max_bytes)
+        self._entries: OrderedDict[str, _UserEntry] = OrderedDict()
+        self._subscribers: dict[tuple[str, str], tuple[Callable[[int], None], ...]] = {}
+        self._lock = threading.Lock()
+        self._opening: dict[str, threading.Lock] = {}   # per-user: serializes opening a store
+        self._hits = 0
+        self._misses = 0
+        self._evictions = {"idle": 0, "lru": 0, "memory": 0}
+
+    def _evictable(self, keep: str | None = None) -> list[str]:
+        """Users in LRU order whose entry may be dropped: not pinned by a
+        subscriber and not ``keep``."""
+        return [u for u, e in self._entries.items() if not e.pins and u != keep]
+
+    def _evict_idle(self, now: float) -> None:
+        if self._idle_ttl <= 0:
+            return
+        stale = [u for u in self._evictable() if now - self._entries[u].last_used > self._idle_ttl]
+        for u in stale:
+            del self._entries[u]
+        self._evictions["idle"] += len(stale)
+
+    def _resident_bytes(self) -> dict[str, int]:
+        return {u: e.storage.memory_estimate() for u, e in self._entries.items()}
+
+    def _evict_over_budget(self, keep: str) -> None:
+        if self._max_bytes <= 0:
+            return
+        sizes = self._resident_bytes()
+        total = sum(sizes.values())
+        for user in self._evictable(keep):
+            if total <= self._max_bytes:
+                break
+            del self._entries[user]
+            total -= sizes[user]
+            self._evictions["memory"] += 1
+
+    def _open_storage(self, user: str) -> AbstractStorage:
+        user_dir = self._data_base / "users" / user
+        if self._backend == "file":
+            return FileStorage(data_dir=user_dir, **self._file_options)
+        db_path = user_dir / "store.sqlite3"
+        if not db_path.exists() and (user_dir / "containers.jsonl").exists():
+            SqliteStorage.create_from(db_path, FileStorage(data_dir=user_dir))
+        return SqliteStorage(db_path)
+
+    def _hit(self, user: str, pin: bool) -> _UserEntry | None:
+        """Resident entry for ``user`` marked as just used.  Caller holds _lock."""
+        entry = self._entries.get(user)
+        if entry is None:
+            return None
+        self._entries.move_to_end(user)
+        entry.last_used = time.monotonic()
+        self._hits += 1
+        if pin:
+            entry.pins += 1
+        self._evict_over_budget(user)
+        return entry
+
+    def _entry(self, user: str, pin: bool = False) -> _UserEntry:
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            entry = self._hit(user, pin)
+            if entry is not None:
+                return entry
+            opening = self._opening.setdefault(user, threading.Lock())
+        # Opening a store (index load, SQLite import) only blocks this user
+        with opening:
+            with self._lock:
+                entry = self._hit(user, pin)   # opened by another request meanwhile
+                if entry is not None:
+                    return entry
+            storage = self._open_storage(user)
+            storage.add_change_listener(functools.partial(self._publish, user))
+            entry = _UserEntry(storage, CognitiveAgent(storage=storage, io_executor=self._io_executor),
+                               time.monotonic())
+            with self._lock:
+                self._entries[user] = entry
+                self._misses += 1
+                excess = len(self._entries) - self._max_users
+                for u in self._evictable(user)[:max(0, excess)]:
+                    del self._entries[u]
+                    self._evictions["lru"] += 1
+                if pin:
+                    entry.pins += 1
+                self._evict_over_budget(user)
+            return entry
+
+    def storage(self, user: str) -> AbstractStorage:
+        return self._entry(user).storage
+
+    def agent(self, user: str) -> CognitiveAgent:
+        return self._entry(user).agent
+
+    # ── Change subscriptions ──────────────────────────────────────────
+    # Pub/sub theo user + container: storage của user bị pin (không evict)
+    # khi còn subscriber, nên luồng SSE không bám vào instance đã bị bỏ.
+
+    def subscribe(self, user: str, container_id: str, callback: Callable[[int], None]) -> AbstractStorage:
+        """Call ``callback(revision)`` whenever ``container_id`` of ``user``
+        changes, until ``unsubscribe``.  Pins the user's entry meanwhile and
+        returns its storage.  Callbacks run on the writing thread."""
+        entry = self._entry(user, pin=True)
+        with self._lock:
+            key = (user, container_id)
+            self._subscribers[key] = (*self._subscribers.get(key, ()), callback)
+        return entry.storage
+
+    def unsubscribe(self, user: str, container_id: str, callback: Callable[[int], None]) -> None:
+        with self._lock:
+            key = (user, container_id)
+            rest = tuple(fn for fn in self._subscribers.get(key, ()) if fn is not callback)
+            if rest:
+                self._subscribers[key] = rest
+            else:
+                self._subscribers.pop(key, None)
+            entry = self._entries.get(user)
+            if entry is not None and entry.pins > 0:
+                entry.pins -= 1
+                entry.last_used = time.monotonic()
+
+    def _publish(self, user: str, container_id: str, revision: int) -> None:
+        for fn in self._subscribers.get((user, container_id), ()):
+            fn(revision)
+
+    def storages(self) -> list[AbstractStorage]:
+        """Snapshot of the currently resident storages (for background jobs)."""
+        with self._lock:
+            return [e.storage for e in self._entries.values()]
+
+    def stats(self) -> dict:
+        """Cache counters + estimated resident bytes across all users."""
+        with self._lock:
+            return {
+                "users": len(self._entries),
+                "pinned": sum(1 for e in self._entries.values() if e.pins),
+                "max_users": self._max_users,
+                "max_bytes": self._max_bytes,
+                "resident_bytes": sum(self._resident_bytes().values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": dict(self._evictions),
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from collections.abc import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one task.
+
+    ``run(key, factory)`` starts ``factory()`` as a task unless one is
+    already running for ``key``; every caller awaits that same task and gets
+    its result or exception.  Callers await it through ``asyncio.shield``, so
+    the task finishes (and its writes land) even if the caller that started
+    it disconnects.  Event-loop only — not thread-safe.
+    """
+
+    def __init__(self):
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.joined = 0
+
+    def join(self, key: Hashable) -> Awaitable | None:
+        """The running call for ``key``, or None if there is none."""
+        task = self._tasks.get(key)
+        if task is None:
+            return None
+        self.joined += 1
+        return _shielded(task)
+
+    def run(self, key: Hashable, factory: Callable[[], Awaitable]) -> Awaitable:
+        joined = self.join(key)
+        if joined is not None:
+            return joined
+        task = asyncio.ensure_future(factory())
+        self._tasks[key] = task
+        self.started += 1
+        task.add_done_callback(functools.partial(self._landed, key))
+        return _shielded(task)
+
+    def _landed(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()                    # the waiters re-raise it; no "never retrieved" log
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._tasks), "started": self.started, "joined": self.joined}
+
+
+def _shielded(task: asyncio.Task) -> asyncio.Future:
+    """``asyncio.shield(task)`` that a caller may drop without awaiting (a
+    disconnected stream): a later failure then is not logged as "Future
+    exception was never retrieved"; callers that do await still get it."""
+    outer = asyncio.shield(task)
+    outer.add_done_callback(_retrieve)
+    return outer
+
+
+def _retrieve(fut: asyncio.Future) -> None:
+    if not fut.cancelled():
+        fut.exception()
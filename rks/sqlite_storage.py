@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import codec
+from .models import GraphEdge, GraphNode, KnowledgeContainer, Source
+from .storage import AbstractStorage, _InterProcessLock, _ModelLoader
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SqliteStorage — indexed, transactional backend (WAL mode)
+# Mỗi entity là một row; record đầy đủ lưu dạng JSON trong cột `data`,
+# các cột dùng để lookup được đánh index.
+# ─────────────────────────────────────────────────────────────────────────────
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS containers (
+    container_id   TEXT PRIMARY KEY,
+    created_at     TEXT NOT NULL,
+    data           TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sources (
+    source_id      TEXT PRIMARY KEY,
+    container_id   TEXT NOT NULL,
+    created_at     TEXT NOT NULL,
+    data           TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id        TEXT PRIMARY KEY,
+    container_id   TEXT NOT NULL,
+    created_at     TEXT NOT NULL,
+    data           TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS edges (
+    edge_id        TEXT PRIMARY KEY,
+    container_id   TEXT NOT NULL,
+    source_node_id TEXT NOT NULL,
+    target_node_id TEXT NOT NULL,
+    data           TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_sources_container ON sources(container_id);
+CREATE INDEX IF NOT EXISTS ix_nodes_container   ON nodes(container_id);
+CREATE INDEX IF NOT EXISTS ix_edges_container   ON edges(container_id);
+CREATE INDEX IF NOT EXISTS ix_edges_source      ON edges(source_node_id);
+CREATE INDEX IF NOT EXISTS ix_edges_target      ON edges(target_node_id);
+CREATE TABLE IF NOT EXISTS changes (
+    entity_id      TEXT PRIMARY KEY,
+    container_id   TEXT NOT NULL,
+    kind           TEXT NOT NULL,
+    op             TEXT NOT NULL,
+    rev            INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_changes_container ON changes(container_id, rev);
+CREATE INDEX IF NOT EXISTS ix_changes_rev       ON changes(rev);
+"""
+
+
+class SqliteStorage(AbstractStorage):
+    """SQLite implementation of AbstractStorage.
+
+    One connection per thread; WAL lets readers run alongside a writer, and
+    every mutating call is a single transaction.
+    """
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._path = db_path
+        self._local = threading.local()
+
+        self._load_container = _ModelLoader(KnowledgeContainer)
+        self._load_source    = _ModelLoader(Source)
+        self._load_node      = _ModelLoader(GraphNode)
+        self._load_edge      = _ModelLoader(GraphEdge)
+
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    # ── internal helpers ──────────────────────────────────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql: str, params: tuple = ()) -> list[str]:
+        return [row[0] for row in self._conn().execute(sql, params)]
+
+    @contextmanager
+    def _transaction(self):
+        """``with conn:`` that announces the logged changes once committed."""
+        conn = self._conn()
+        self._local.logged = logged = {}
+        with conn:
+            yield conn
+        self._local.logged = None
+        for rev, cids in logged.items():
+            self._emit_changes(cids, rev)
+
+    def _log_changes(self, conn: sqlite3.Connection, changes: list[tuple[str, str, str, str]]) -> None:
+        """Record (kind, entity_id, container_id, op) under one new revision.
+        Runs after the data writes, inside the same transaction, so the
+        write lock is already held and revisions cannot interleave."""
+        if not changes:
+            return
+        (rev,) = conn.execute("SELECT COALESCE(MAX(rev), 0) + 1 FROM changes").fetchone()
+        self._local.logged.setdefault(rev, dict.fromkeys(cid for _, _, cid, _ in changes))
+        conn.executemany(
+            "INSERT INTO changes (entity_id, container_id, kind, op, rev) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(entity_id) DO UPDATE SET container_id = excluded.container_id, "
+            "kind = excluded.kind, op = excluded.op, rev = excluded.rev",
+            [(eid, cid, kind, op, rev) for kind, eid, cid, op in changes],
+        )
+
+    @staticmethod
+    def _dump(obj) -> tuple[dict, str]:
+        data = obj.model_dump(mode="json")
+        return data, codec.dumps(data).decode("utf-8")
+
+    # ── CONTAINERS ────────────────────────────────────────────────────────
+
+    def list_containers(self) -> list[KnowledgeContainer]:
+        rows = self._query("SELECT data FROM containers ORDER BY created_at")
+        return [self._load_container.one_json(r) for r in rows]
+
+    def get_container(self, container_id: str) -> KnowledgeContainer | None:
+        rows = self._query("SELECT data FROM containers WHERE container_id = ?", (container_id,))
+        return self._load_container.one_json(rows[0]) if rows else None
+
+    def upsert_container(self, c: KnowledgeContainer) -> None:
+        with self._transaction() as conn:
+            self._write_container(conn, c)
+            self._log_changes(conn, [("container", c.container_id, "", "upsert")])
+
+    def _write_container(self, conn: sqlite3.Connection, c: KnowledgeContainer) -> None:
+        data, raw = self._dump(c)
+        conn.execute(
+            "INSERT INTO containers (container_id, created_at, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(container_id) DO UPDATE SET created_at = excluded.created_at, data = excluded.data",
+            (c.container_id, data["created_at"], raw),
+        )
+
+    def delete_container(self, container_id: str) -> None:
+        with self._transaction() as conn:
+            for table in ("edges", "nodes", "sources", "containers"):
+                conn.execute(f"DELETE FROM {table} WHERE container_id = ?", (container_id,))
+            # Mark the container's own records deleted rather than dropping
+            # them, so its revisions keep growing if the ID is ever reused.
+            conn.execute("UPDATE changes SET op = 'delete' WHERE container_id = ?", (container_id,))
+            self._log_changes(conn, [("container", container_id, "", "delete")])
+
+    # ── SOURCES ───────────────────────────────────────────────────────────
+
+    def list_sources(self, container_id: str) -> list[Source]:
+        rows = self._query("SELECT data FROM sources WHERE container_id = ? ORDER BY created_at", (container_id,))
+        return [self._load_source.one_json(r) for r in rows]
+
+    def upsert_source(self, s: Source) -> None:
+        with self._transaction() as conn:
+            self._write_source(conn, s)
+            self._log_changes(conn, [("source", s.source_id, s.container_id, "upsert")])
+
+    def _write_source(self, conn: sqlite3.Connection, s: Source) -> None:
+        data, raw = self._dump(s)
+        conn.execute(
+            "INSERT INTO sources (source_id, container_id, created_at, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(source_id) DO UPDATE SET container_id = excluded.container_id, "
+            "created_at = excluded.created_at, data = excluded.data",
+            (s.source_id, s.container_id, data["created_at"], raw),
+        )
+
+    def delete_source(self, source_id: str) -> None:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT container_id FROM sources WHERE source_id = ?", (source_id,)).fetchone()
+            if row is None:
+                return
+            conn.execute("DELETE FROM sources WHERE source_id = ?", (source_id,))
+            self._log_changes(conn, [("source", source_id, row[0], "delete")])
+
+    # ── NODES ─────────────────────────────────────────────────────────────
+
+    def list_nodes(self, container_id: str) -> list[GraphNode]:
+        rows = self._query("SELECT data FROM nodes WHERE container_id = ? ORDER BY created_at", (container_id,))
+        return [self._load_node.one_json(r) for r in rows]
+
+    def list_node_rows(self, container_id: str) -> list[dict]:
+        rows = self._query("SELECT data FROM nodes WHERE container_id = ? ORDER BY created_at", (container_id,))
+        return self._load_node.rows([codec.loads(r) for r in rows])
+
+    def get_node(self, node_id: str) -> GraphNode | None:
+        rows = self._query("SELECT data FROM nodes WHERE node_id = ?", (node_id,))
+        return self._load_node.one_json(rows[0]) if rows else None
+
+    def upsert_node(self, node: GraphNode) -> None:
+        with self._transaction() as conn:
+            self._write_node(conn, node)
+            self._log_changes(conn, [("node", node.node_id, node.container_id, "upsert")])
+
+    def _write_node(self, conn: sqlite3.Connection, node: GraphNode) -> None:
+        data, raw = self._dump(node)
+        conn.execute(
+            "INSERT INTO nodes (node_id, container_id, created_at, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(node_id) DO UPDATE SET container_id = excluded.container_id, "
+            "created_at = excluded.created_at, data = excluded.data",
+            (node.node_id, node.container_id, data["created_at"], raw),
+        )
+
+    def delete_node(self, node_id: str) -> None:
+        """Delete node + all its edges."""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT container_id FROM nodes WHERE node_id = ?", (node_id,)).fetchone()
+            if row is None:
+                return
+            edge_ids = [eid for (eid,) in conn.execute(
+                "SELECT edge_id FROM edges WHERE source_node_id = ?1 OR target_node_id = ?1", (node_id,))]
+            conn.execute("DELETE FROM edges WHERE source_node_id = ? OR target_node_id = ?", (node_id, node_id))
+            conn.execute("DELETE FROM nodes WHERE node_id = ?", (node_id,))
+            self._log_changes(conn, [("node", node_id, row[0], "delete"),
+                                     *(("edge", eid, row[0], "delete") for eid in edge_ids)])
+
+    def delete_node_cascade(self, node_id: str) -> tuple[list[str], list[str]]:
+        """Delete node and all purely-downstream nodes (only 1 incoming edge from this node).
+        Returns (deleted node_ids, deleted edge_ids)."""
+        node = self.get_node(node_id)
+        if node is None:
+            return [], []
+        conn = self._conn()
+        to_delete: list[str] = []
+        queue = deque([node_id])
+        visited: set[str] = set()
+        while queue:
+            current = queue.popleft()
+            if current in visited:
+                continue
+            visited.add(current)
+            to_delete.append(current)
+            # Children whose only incoming edge comes from `current`
+            children = conn.execute(
+                "SELECT e.target_node_id FROM edges e WHERE e.source_node_id = ? "
+                "AND (SELECT COUNT(*) FROM edges p WHERE p.target_node_id = e.target_node_id) = 1",
+                (current,),
+            ).fetchall()
+            queue.extend(row[0] for row in children)
+
+        edge_ids: dict[str, None] = {}
+        with self._transaction() as conn:
+            for nid in to_delete:
+                for (eid,) in conn.execute(
+                    "SELECT edge_id FROM edges WHERE source_node_id = ?1 OR target_node_id = ?1", (nid,)
+                ).fetchall():
+                    edge_ids[eid] = None
+                conn.execute("DELETE FROM edges WHERE source_node_id = ?1 OR target_node_id = ?1", (nid,))
+            conn.executemany("DELETE FROM nodes WHERE node_id = ?", [(nid,) for nid in to_delete])
+            self._log_changes(conn, [*(("node", nid, node.container_id, "delete") for nid in to_delete),
+                                     *(("edge", eid, node.container_id, "delete") for eid in edge_ids)])
+        return to_delete, list(edge_ids)
+
+    # ── EDGES ─────────────────────────────────────────────────────────────
+
+    def list_edges(self, container_id: str) -> list[GraphEdge]:
+        rows = self._query("SELECT data FROM edges WHERE container_id = ? ORDER BY rowid", (container_id,))
+        return [self._load_edge.one_json(r) for r in rows]
+
+    def list_edge_rows(self, container_id: str) -> list[dict]:
+        rows = self._query("SELECT data FROM edges WHERE container_id = ? ORDER BY rowid", (container_id,))
+        return self._load_edge.rows([codec.loads(r) for r in rows])
+
+    def get_edge(self, edge_id: str) -> GraphEdge | None:
+        rows = self._query("SELECT data FROM edges WHERE edge_id = ?", (edge_id,))
+        return self._load_edge.one_json(rows[0]) if rows else None
+
+    def upsert_edge(self, edge: GraphEdge) -> None:
+        with self._transaction() as conn:
+            self._write_edge(conn, edge)
+            self._log_changes(conn, [("edge", edge.edge_id, edge.container_id, "upsert")])
+
+    def _write_edge(self, conn: sqlite3.Connection, edge: GraphEdge) -> None:
+        _, raw = self._dump(edge)
+        conn.execute(
+            "INSERT INTO edges (edge_id, container_id, source_node_id, target_node_id, data) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(edge_id) DO UPDATE SET container_id = excluded.container_id, "
+            "source_node_id = excluded.source_node_id, target_node_id = excluded.target_node_id, "
+            "data = excluded.data",
+            (edge.edge_id, edge.container_id, edge.source_node_id, edge.target_node_id, raw),
+        )
+
+    def delete_edge(self, edge_id: str) -> None:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT container_id FROM edges WHERE edge_id = ?", (edge_id,)).fetchone()
+            if row is None:
+                return
+            conn.execute("DELETE FROM edges WHERE edge_id = ?", (edge_id,))
+            self._log_changes(conn, [("edge", edge_id, row[0], "delete")])
+
+    def list_edges_for_node(self, node_id: str, direction: str = "both") -> list[GraphEdge]:
+        where = {
+            "out":  "source_node_id = ?1",
+            "in":   "target_node_id = ?1",
+            "both": "source_node_id = ?1 OR target_node_id = ?1",
+        }.get(direction)
+        if where is None:
+            raise ValueError(f"Unknown edge direction: {direction}")
+        rows = self._query(f"SELECT data FROM edges WHERE {where} ORDER BY rowid", (node_id,))
+        return [self._load_edge.one_json(r) for r in rows]
+
+    def edge_count(self, node_id: str) -> int:
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM edges WHERE source_node_id = ?1 OR target_node_id = ?1", (node_id,)
+        ).fetchone()
+        return row[0]
+
+    # ── BULK ──────────────────────────────────────────────────────────────
+
+    def upsert_many(self, nodes: list[GraphNode] = (), edges: list[GraphEdge] = (),
+                    sources: list[Source] = ()) -> None:
+        """All records in one transaction."""
+        with self._transaction() as conn:
+            for s in sources:
+                self._write_source(conn, s)
+            for n in nodes:
+                self._write_node(conn, n)
+            for e in edges:
+                self._write_edge(conn, e)
+            self._log_changes(conn, [*(("source", s.source_id, s.container_id, "upsert") for s in sources),
+                                     *(("node", n.node_id, n.container_id, "upsert") for n in nodes),
+                                     *(("edge", e.edge_id, e.container_id, "upsert") for e in edges)])
+
+    # ── CHANGE FEED ───────────────────────────────────────────────────────
+
+    def container_revision(self, container_id: str, kinds: tuple[str, ...] = ("node", "edge")) -> int:
+        row = self._conn().execute(
+            f"SELECT COALESCE(MAX(rev), 0) FROM changes WHERE container_id = ? "
+            f"AND kind IN ({','.join('?' * len(kinds))})", (container_id, *kinds),
+        ).fetchone()
+        return row[0]
+
+    def store_revision(self) -> int:
+        return self.container_revision("", ("container",))
+
+    def container_of(self, entity_id: str) -> str | None:
+        rows = self._query("SELECT container_id FROM changes WHERE entity_id = ? AND op = 'upsert'",
+                           (entity_id,))
+        return rows[0] if rows else None
+
+    def changes_since(self, container_id: str, since: int) -> dict | None:
+        """Deletes are kept in the changes table, so every ``since`` is answerable."""
+        conn = self._conn()
+        entries = conn.execute(
+            "SELECT entity_id, kind, op, rev FROM changes WHERE container_id = ? AND rev > ? "
+            "AND kind IN ('node', 'edge')",
+            (container_id, since),
+        ).fetchall()
+        # Taken from the entries themselves: a change committed after this
+        # read must not be covered by the revision handed back.
+        result = {"revision": max((e[3] for e in entries), default=since), "nodes": [], "edges": [],
+                  "deleted_node_ids": [], "deleted_edge_ids": []}
+        for kind, table, load in (("node", "nodes", self._load_node), ("edge", "edges", self._load_edge)):
+            ids = [e[0] for e in entries if e[1] == kind and e[2] == "upsert"]
+            result[f"deleted_{kind}_ids"] = [e[0] for e in entries if e[1] == kind and e[2] == "delete"]
+            rows = []
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows += conn.execute(
+                    f"SELECT data FROM {table} WHERE {kind}_id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            result[f"{kind}s"] = load.rows([codec.loads(r[0]) for r in rows])
+        return result
+
+    # ── IMPORT ────────────────────────────────────────────────────────────
+
+    def import_from(self, other: AbstractStorage) -> dict[str, int]:
+        """One-shot copy of every live record from another storage (e.g. the
+        JSONL FileStorage), in a single transaction.  Returns the number of
+        records imported per kind."""
+        counts = {"containers": 0, "sources": 0, "nodes": 0, "edges": 0}
+        with self._transaction() as conn:
+            for c in other.list_containers():
+                sources = other.list_sources(c.container_id)
+                nodes = other.list_nodes(c.container_id)
+                edges = other.list_edges(c.container_id)
+                self._write_container(conn, c)
+                for s in sources:
+                    self._write_source(conn, s)
+                for n in nodes:
+                    self._write_node(conn, n)
+                for e in edges:
+                    self._write_edge(conn, e)
+                self._log_changes(conn, [("container", c.container_id, "", "upsert")])
+                self._log_changes(conn, [*(("source", s.source_id, c.container_id, "upsert") for s in sources),
+                                         *(("node", n.node_id, c.container_id, "upsert") for n in nodes),
+                                         *(("edge", e.edge_id, c.container_id, "upsert") for e in edges)])
+                counts["containers"] += 1
+                counts["sources"] += len(sources)
+                counts["nodes"] += len(nodes)
+                counts["edges"] += len(edges)
+        return counts
+
+    @classmethod
+    def create_from(cls, db_path: Path, other: AbstractStorage) -> dict[str, int] | None:
+        """Build a new database at ``db_path`` from ``other``.
+
+        The import runs into a temporary file that is renamed into place only
+        once complete, so a failure or crash never leaves a partial database
+        behind.  Processes creating the same path serialize on a lock file;
+        returns None (nothing imported) when ``db_path`` already exists."""
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with _InterProcessLock(db_path.with_name(db_path.name + ".lock")):
+            if db_path.exists():
+                return None
+            tmp = db_path.with_name(db_path.name + ".importing")
+            sidecars = ("", "-wal", "-shm", "-journal")
+            for suffix in sidecars:
+                Path(f"{tmp}{suffix}").unlink(missing_ok=True)
+            try:
+                staging = cls(tmp)
+                counts = staging.import_from(other)
+                conn = staging._conn()
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.close()
+                for suffix in sidecars[1:]:    # stale WAL of an earlier db_path
+                    Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+                os.replace(tmp, db_path)
+            finally:
+                for suffix in sidecars:
+                    Path(f"{tmp}{suffix}").unlink(missing_ok=True)
+        return counts
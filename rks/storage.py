@@ -1,13 +1,31 @@
 from __future__ import annotations
 
-import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
 from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable
 from pathlib import Path
 
 from pydantic import TypeAdapter
 
+from . import codec
+
+try:
+    import fcntl
+except ImportError:  # Windows — only in-process locking is available
+    fcntl = None
+
 from .models import GraphEdge, GraphNode, KnowledgeContainer, Source
 
+log = logging.getLogger(__name__)
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # AbstractStorage — interface contract
@@ -43,7 +61,8 @@ class AbstractStorage(ABC):
     @abstractmethod
     def delete_node(self, node_id: str) -> None: ...
     @abstractmethod
-    def delete_node_cascade(self, node_id: str) -> list[str]: ...
+    def delete_node_cascade(self, node_id: str) -> tuple[list[str], list[str]]:
+        """Returns (deleted node_ids, deleted edge_ids)."""
 
     # Edges
     @abstractmethod
@@ -54,199 +73,1485 @@ class AbstractStorage(ABC):
     def upsert_edge(self, edge: GraphEdge) -> None: ...
     @abstractmethod
     def delete_edge(self, edge_id: str) -> None: ...
+    @abstractmethod
+    def list_edges_for_node(self, node_id: str, direction: str = "both") -> list[GraphEdge]:
+        """Edges touching one node.  direction: "out" | "in" | "both"."""
+    @abstractmethod
+    def edge_count(self, node_id: str) -> int: ...
+
+    # Change feed — every write bumps a revision
+    @abstractmethod
+    def container_revision(self, container_id: str, kinds: tuple[str, ...] = ("node", "edge")) -> int:
+        """Latest revision of the container's records of ``kinds`` ("node",
+        "edge", "source"); 0 = none yet.  Only ever grows, so it can be used
+        as a cache validator."""
+    @abstractmethod
+    def store_revision(self) -> int:
+        """Latest revision of the container list itself."""
+    @abstractmethod
+    def changes_since(self, container_id: str, since: int) -> dict | None:
+        """Nodes/edges upserted or deleted after revision ``since``:
+        {"revision", "nodes", "edges", "deleted_node_ids", "deleted_edge_ids"}
+        with JSON-ready rows.  None if that history is no longer kept and the
+        caller has to reload the whole graph."""
+    @abstractmethod
+    def container_of(self, entity_id: str) -> str | None:
+        """Container of a live node/edge/source according to the change feed,
+        without reading the record; None if unknown or deleted."""
+
+    # In-process change notifications: listener(container_id, revision) is
+    # called after each committed write ("" = the container list itself).
+    # Writes made by other processes are not announced; poll the revision.
+    _change_listeners: tuple[Callable[[str, int], None], ...] = ()
+
+    def add_change_listener(self, listener: Callable[[str, int], None]) -> None:
+        self._change_listeners = (*self._change_listeners, listener)
+
+    def remove_change_listener(self, listener: Callable[[str, int], None]) -> None:
+        self._change_listeners = tuple(fn for fn in self._change_listeners if fn is not listener)
+
+    def _emit_changes(self, container_ids, revision: int) -> None:
+        for fn in self._change_listeners:
+            for cid in container_ids:
+                try:
+                    fn(cid, revision)
+                except Exception:         # a broken subscriber must not fail the write
+                    log.exception("Change listener %r failed for container %r", fn, cid)
+
+    # Raw rows — JSON-ready dicts for endpoints that only serialize
+    def list_node_rows(self, container_id: str) -> list[dict]:
+        """``list_nodes`` as JSON-ready dicts.  Backends override this to skip
+        building models; the default dumps them."""
+        return [n.model_dump(mode="json") for n in self.list_nodes(container_id)]
+
+    def list_edge_rows(self, container_id: str) -> list[dict]:
+        """``list_edges`` as JSON-ready dicts."""
+        return [e.model_dump(mode="json") for e in self.list_edges(container_id)]
+
+    # Memory
+    def memory_estimate(self) -> int:
+        """Approximate bytes this store keeps resident in the process.
+        Backends that cache data in RAM override this; the default is 0."""
+        return 0
+
+    # Bulk
+    def upsert_many(self, nodes: list[GraphNode] = (), edges: list[GraphEdge] = (),
+                    sources: list[Source] = ()) -> None:
+        """Write several records at once.  Backends override this to batch
+        the I/O; the default just loops."""
+        for s in sources:
+            self.upsert_source(s)
+        for n in nodes:
+            self.upsert_node(n)
+        for e in edges:
+            self.upsert_edge(e)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Write path: cross-process lock + group commit
+# Cho phép chạy uvicorn --workers N trên cùng một data/ dir.
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _InterProcessLock:
+    """Re-entrant exclusive lock shared by threads (RLock) and by worker
+    processes (fcntl.flock on a lock file).  Without fcntl only the
+    in-process half applies.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._owner: int | None = None
+        self._fd: int | None = None
+
+    def owned(self) -> bool:
+        """True if the calling thread currently holds the lock."""
+        return self._owner == threading.get_ident()
+
+    def __enter__(self) -> _InterProcessLock:
+        self._rlock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                if self._fd is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._rlock.release()
+                raise
+        self._depth += 1
+        self._owner = threading.get_ident()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self._owner = None
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._rlock.release()
+
+    def __del__(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+
+
+class _Durability:
+    """fsync policy for a store's appends.
+
+      none   — rely on the OS page cache (fastest, last writes may be lost on
+               power failure)
+      batch  — a background flusher fsyncs dirty files every ``interval``
+               seconds, or sooner once ``batch_records`` records are pending
+      always — fsync before the write returns (group commit amortises it)
+
+    Also keeps flush latency counters for the admin stats endpoint.
+    """
+
+    MODES = ("none", "batch", "always")
+
+    def __init__(self, mode: str = "none", interval: float = 0.05, batch_records: int = 100):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown durability mode: {mode}")
+        self.mode = mode
+        self._interval = interval
+        self._batch_records = max(1, batch_records)
+        self._cond = threading.Condition()
+        self._dirty: dict[Path, int] = {}      # path → records written since last fsync
+        self._flusher: threading.Thread | None = None
+        self._flushes = 0
+        self._synced_records = 0
+        self._total_s = 0.0
+        self._max_s = 0.0
+        self._last_s = 0.0
+
+    def _record(self, elapsed: float, records: int) -> None:
+        with self._cond:
+            self._flushes += 1
+            self._synced_records += records
+            self._total_s += elapsed
+            self._max_s = max(self._max_s, elapsed)
+            self._last_s = elapsed
+
+    def written(self, fd: int, path: Path, records: int) -> None:
+        """Called right after ``records`` lines were written through ``fd``."""
+        if self.mode == "always":
+            t0 = time.perf_counter()
+            os.fsync(fd)
+            self._record(time.perf_counter() - t0, records)
+        elif self.mode == "batch":
+            with self._cond:
+                self._dirty[path] = self._dirty.get(path, 0) + records
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._run, name="storage-fsync", daemon=True)
+                    self._flusher.start()
+                elif sum(self._dirty.values()) >= self._batch_records:
+                    self._cond.notify()
+
+    def _run(self) -> None:
+        idle_rounds = 0
+        while True:
+            with self._cond:
+                if sum(self._dirty.values()) < self._batch_records:
+                    self._cond.wait(self._interval)
+                if not self._dirty:
+                    idle_rounds += 1
+                    if idle_rounds >= 100:      # nothing to do for a while → exit
+                        self._flusher = None
+                        return
+                    continue
+                dirty, self._dirty = self._dirty, {}
+            idle_rounds = 0
+            self.sync(dirty)
+
+    def sync(self, dirty: dict[Path, int] | None = None) -> None:
+        """fsync the given (default: all pending) dirty files now."""
+        if dirty is None:
+            with self._cond:
+                dirty, self._dirty = self._dirty, {}
+        for path, records in dirty.items():
+            t0 = time.perf_counter()
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue                        # replaced by compaction (already fsync'ed)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._record(time.perf_counter() - t0, records)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "mode": self.mode,
+                "flushes": self._flushes,
+                "synced_records": self._synced_records,
+                "pending_records": sum(self._dirty.values()),
+                "avg_flush_ms": round(self._total_s / self._flushes * 1000, 3) if self._flushes else 0.0,
+                "max_flush_ms": round(self._max_s * 1000, 3),
+                "last_flush_ms": round(self._last_s * 1000, 3),
+            }
+
+
+def _drop_torn_tail(f, before_truncate: Callable[[], None] | None = None) -> int:
+    """Cut a torn last line — left by a crash mid-append — off the append-only
+    file ``f`` (opened "a+b", under the store lock), so the next record starts
+    on a line of its own instead of being glued onto the fragment.  Returns
+    the size the file ends up with."""
+    size = f.seek(0, os.SEEK_END)
+    end = size
+    while end > 0:
+        step = min(end, 4096)
+        f.seek(end - step)
+        nl = f.read(step).rfind(b"\n")
+        if nl >= 0:
+            end = end - step + nl + 1
+            break
+        end -= step
+    if end != size:
+        if before_truncate is not None:
+            before_truncate()
+        f.truncate(end)
+    return end
+
+
+def _scan_for_record(path: Path, id_field: str, rid: str) -> dict | None:
+    """Latest line of the JSONL file ``path`` whose ``id_field`` is ``rid``,
+    found by a byte search over a read-only mapping rather than by loading
+    the file into an index."""
+    try:
+        f = path.open("rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            needle = rid.encode("utf-8")
+            end = len(mm)
+            while (hit := mm.rfind(needle, 0, end)) >= 0:
+                start = mm.rfind(b"\n", 0, hit) + 1
+                stop = mm.find(b"\n", hit)
+                end = start
+                if stop < 0:
+                    continue                   # torn last line
+                try:
+                    rec = codec.loads(mm[start:stop])
+                except ValueError:
+                    continue
+                if isinstance(rec, dict) and rec.get(id_field) == rid:
+                    return rec
+    return None
+
+
+class _PendingWrite:
+    __slots__ = ("data", "recs", "sizes", "done", "error")
+
+    def __init__(self, data: bytes, recs: list[dict], sizes: list[int]):
+        self.data = data
+        self.recs = recs
+        self.sizes = sizes                     # encoded line length per record
+        self.done = False
+        self.error: BaseException | None = None
+
+
+class _GroupCommitWriter:
+    """Batches concurrent appends to one file into a single write.
+
+    The first thread to arrive becomes the leader: it takes the store lock,
+    writes everything queued so far in one ``write()`` and wakes the waiters.
+    Threads arriving meanwhile queue up for the leader's next round.
+    ``on_commit(start_offset, stat, recs, sizes)`` runs under the store lock
+    after each round so the index can apply the records in place;
+    ``before_truncate()`` runs before a torn tail is cut off.  With
+    ``prepare(batch)``, writes are queued as records only and ``prepare``
+    fills in each one's data and sizes under the store lock, just before the
+    round is written (the change log numbers its revisions there).
+    """
+
+    def __init__(self, path: Path, lock: _InterProcessLock,
+                 on_commit: Callable[[int, os.stat_result, list[dict], list[int]], None],
+                 durability: _Durability, before_truncate: Callable[[], None] | None = None,
+                 prepare: Callable[[list[_PendingWrite]], None] | None = None):
+        self.path = path
+        self._lock = lock
+        self._on_commit = on_commit
+        self._durability = durability
+        self._before_truncate = before_truncate
+        self._prepare = prepare
+        self._cond = threading.Condition()
+        self._queue: list[_PendingWrite] = []
+        self._leading = False
+
+    def write(self, data: bytes, recs: list[dict], sizes: list[int]) -> None:
+        if self._lock.owned():
+            # Caller already holds the store lock (compaction/migration):
+            # queueing behind another leader would deadlock, so write directly.
+            self._flush([_PendingWrite(data, recs, sizes)])
+            return
+        pending = _PendingWrite(data, recs, sizes)
+        with self._cond:
+            self._queue.append(pending)
+            if self._leading:
+                while not pending.done:
+                    self._cond.wait()
+            else:
+                self._leading = True
+        if not pending.done:
+            self._lead()
+        if pending.error is not None:
+            raise pending.error
+
+    def _lead(self) -> None:
+        while True:
+            with self._cond:
+                if not self._queue:
+                    self._leading = False
+                    return
+                batch, self._queue = self._queue, []
+            error: BaseException | None = None
+            try:
+                self._flush(batch)
+            except BaseException as e:
+                error = e
+            with self._cond:
+                for p in batch:
+                    p.error = error
+                    p.done = True
+                self._cond.notify_all()
+
+    def _flush(self, batch: list[_PendingWrite]) -> None:
+        with self._lock:
+            if self._prepare is not None:
+                self._prepare(batch)
+            data = b"".join(p.data for p in batch)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a+b") as f:
+                start = _drop_torn_tail(f, self._before_truncate)
+                f.write(data)
+                f.flush()
+                recs = [r for p in batch for r in p.recs]
+                self._durability.written(f.fileno(), self.path, len(recs))
+                st = os.fstat(f.fileno())
+            self._on_commit(start, st, recs, [n for p in batch for n in p.sizes])
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# _ModelLoader — stored row → pydantic model
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _ModelLoader:
+    """Materializes stored rows into ``model`` instances, or hands them out
+    as JSON-ready dicts without building a model at all.
+
+    Rows are the app's own ``model_dump(mode="json")`` output, so a row that
+    carries exactly the model's fields is already what the API would send;
+    rows written before a field was added (or otherwise off-shape) are
+    validated and re-dumped so callers always see the current schema.
+    """
+
+    def __init__(self, model: type):
+        self._ta = TypeAdapter(model)
+        self._fields = frozenset(model.model_fields)
+
+    def one(self, row: dict):
+        return self._ta.validate_python(row)
+
+    def many(self, rows: list[dict]) -> list:
+        validate = self._ta.validate_python
+        return [validate(r) for r in rows]
+
+    def one_json(self, data: str | bytes):
+        return self._ta.validate_json(data)
+
+    def rows(self, rows: list[dict]) -> list[dict]:
+        """JSON-ready dicts.  Trusted rows are returned as-is — they may be
+        shared with a resident index, so callers must not mutate them."""
+        fields = self._fields
+        return [r if r.keys() == fields else self._ta.dump_python(self.one(r), mode="json")
+                for r in rows]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# _JsonlIndex — resident view of one append-only JSONL file
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _JsonlIndex:
+    """In-memory index over one JSONL file: id → latest record, plus
+    secondary maps field value → ids (container_id, and for edges the
+    source/target node ids, which makes up the adjacency index).
+
+    The file is append-only, so the index remembers the byte offset it has
+    consumed and on each read only parses lines appended since then.  A full
+    reload happens only when the file was replaced or rewritten (inode
+    change, shrink, or mtime change without growth).
+
+    ``mode`` decides what stays resident per ID:
+      resident — the decoded record (fastest reads, memory grows with data)
+      offsets  — only the byte offset of its latest line plus the indexed
+                 field values; reads mmap the file and decode just that line
+
+    ``save_snapshot`` writes the resident state next to the file
+    (``<name>.snap``, or the ``<name>.idx`` offset sidecar in offsets mode)
+    together with the byte offset it covers; a full reload starts from a
+    matching snapshot and only parses the JSONL tail after it.
+
+    Writes go through a _GroupCommitWriter under ``lock``, which is shared by
+    every index of a store and held across processes.
+    """
+
+    def __init__(self, path: Path, id_field: str, keys: tuple[str, ...] = ("container_id",),
+                 lock: _InterProcessLock | None = None, durability: _Durability | None = None,
+                 mode: str = "resident"):
+        if mode not in _INDEX_MODES:
+            raise ValueError(f"Unknown index mode: {mode}")
+        self.path = path
+        self.id_field = id_field
+        self.mode = mode
+        self._keys = keys
+        # resident: id → record; offsets: id → (offset, *values of keys)
+        self._records: dict[str, dict | tuple] = {}
+        # field → value → ordered set of ids
+        self._by: dict[str, dict[str, dict[str, None]]] = {k: {} for k in keys}
+        self._offset = 0                       # bytes of the file already indexed
+        self._lines = 0                        # records in the file (live + superseded)
+        self._ino: int | None = None
+        self._mtime_ns: int | None = None
+        self._loaded = False
+        self._snap_offset = 0                  # file offset covered by our snapshot
+        self._mm: mmap.mmap | None = None
+        self._mm_ino: int | None = None
+        self._lock = threading.RLock()
+        self._write_lock = lock or _InterProcessLock(path.with_name(path.name + ".lock"))
+        self._writer = _GroupCommitWriter(path, self._write_lock, self._committed,
+                                          durability or _Durability(), self._release_map,
+                                          self._prepare_batch)
+
+    # Hook for _GroupCommitWriter; records whose lines depend on the file
+    # state (the change log's revisions) are encoded here, under the lock.
+    _prepare_batch = None
+
+    def _stat(self):
+        try:
+            return self.path.stat()
+        except FileNotFoundError:
+            return None
+
+    def _put(self, rec: dict, offset: int) -> None:
+        rid = rec[self.id_field]
+        if self.mode == "resident":
+            self._index(rid, rec, rec.get)
+        else:
+            self._index(rid, (offset, *(rec.get(k) for k in self._keys)), rec.get)
+
+    def _index(self, rid: str, entry: dict | tuple, value_of: Callable[[str], str | None]) -> None:
+        prev = self._records.get(rid)
+        self._records[rid] = entry
+        self._lines += 1
+        for key, groups in self._by.items():
+            value = value_of(key)
+            old = self._value(prev, key) if prev is not None else None
+            if prev is not None and old != value:
+                groups.get(old, {}).pop(rid, None)
+            if value is not None:
+                groups.setdefault(value, {})[rid] = None
+
+    def _value(self, entry: dict | tuple, key: str) -> str | None:
+        if self.mode == "resident":
+            return entry.get(key)
+        return entry[1 + self._keys.index(key)]
+
+    def _reset(self) -> None:
+        self._records.clear()
+        for groups in self._by.values():
+            groups.clear()
+        self._offset = 0
+        self._lines = 0
+        self._unmap()
+
+    # ── offsets mode: decode one line through mmap ───────────────────────
+
+    def _unmap(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _release_map(self) -> None:
+        with self._lock:                       # the file is about to be truncated
+            self._unmap()
+
+    def _decode(self, offset: int) -> dict:
+        mm = self._mm
+        end = -1
+        if mm is not None and self._mm_ino == self._ino and offset < len(mm):
+            end = mm.find(b"\n", offset)
+        if end < 0:
+            self._unmap()                      # first read, or the line lies past the mapping
+            with self.path.open("rb") as f:
+                mm = self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mm_ino = self._ino
+            end = mm.find(b"\n", offset)
+        return codec.loads(mm[offset:end])
+
+    def _rec(self, entry: dict | tuple) -> dict:
+        return entry if self.mode == "resident" else self._decode(entry[0])
+
+    def _read_tail(self) -> None:
+        """Parse complete lines from ``_offset`` to EOF and merge them in."""
+        with self.path.open("rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1          # ignore a trailing partial line
+        if end == 0:
+            return
+        pos = self._offset
+        for line in chunk[:end].split(b"\n"):
+            if line.strip():
+                try:
+                    rec = codec.loads(line)
+                except ValueError:
+                    rec = None                 # torn fragment glued to the next record
+                if isinstance(rec, dict) and self.id_field in rec:
+                    self._put(rec, pos)
+            pos += len(line) + 1
+        self._offset += end
+
+    # ── snapshot ─────────────────────────────────────────────────────────
+    # Layout: magic | header | body.  The body is one JSON array: the latest
+    # record per ID, or [id, offset, *indexed values] rows in offsets mode.
+    # The header ties it to the JSONL file: inode, offset covered, and a CRC
+    # of the bytes just before that offset, so a file that was replaced or
+    # rewritten in place never matches a stale snapshot.
+
+    @property
+    def snap_path(self) -> Path:
+        suffix = ".snap" if self.mode == "resident" else ".idx"
+        return self.path.with_name(self.path.name + suffix)
+
+    def _fingerprint(self, offset: int) -> int:
+        start = max(0, offset - _SNAP_FINGERPRINT_BYTES)
+        with self.path.open("rb") as f:
+            f.seek(start)
+            return zlib.crc32(f.read(offset - start))
+
+    def _load_snapshot(self, st: os.stat_result) -> bool:
+        """Seed an empty index from a snapshot that matches the file on disk."""
+        try:
+            data = self.snap_path.read_bytes()
+        except FileNotFoundError:
+            return False
+        magic = _INDEX_MODES[self.mode]
+        body_at = len(magic) + _SNAP_HEADER.size
+        if len(data) < body_at or not data.startswith(magic):
+            return False
+        ino, offset, lines, body_len, body_crc, tail_crc = _SNAP_HEADER.unpack_from(data, len(magic))
+        body = data[body_at:]
+        if (ino != st.st_ino or offset > st.st_size or len(body) != body_len
+                or zlib.crc32(body) != body_crc or self._fingerprint(offset) != tail_crc):
+            return False
+        try:
+            rows = codec.loads(body)
+        except ValueError:
+            return False
+        if self.mode == "resident":
+            for r in rows:
+                self._put(r, 0)
+        else:
+            for rid, *entry in rows:
+                values = dict(zip(self._keys, entry[1:]))
+                self._index(rid, tuple(entry), values.get)
+        self._offset = offset
+        self._lines = lines
+        self._snap_offset = offset
+        return True
+
+    def snapshot_lag(self) -> int:
+        """Bytes of JSONL a cold load would still have to parse."""
+        with self._lock:
+            self._ensure_fresh()
+            return self._offset - self._snap_offset
+
+    def save_snapshot(self) -> bool:
+        """Write the current state to ``snap_path`` (atomic replace).
+        Returns False when there is nothing on disk to snapshot."""
+        with self._lock:
+            self._ensure_fresh()
+            if self._ino is None or self._offset == 0:
+                return False
+            ino, offset, lines = self._ino, self._offset, self._lines
+            if self.mode == "resident":
+                rows = list(self._records.values())
+            else:
+                rows = [[rid, *entry] for rid, entry in self._records.items()]
+            tail_crc = self._fingerprint(offset)
+        body = codec.dumps(rows)
+        header = _SNAP_HEADER.pack(ino, offset, lines, len(body), zlib.crc32(body), tail_crc)
+        tmp = self.snap_path.with_name(f"{self.snap_path.name}.{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            f.write(_INDEX_MODES[self.mode])
+            f.write(header)
+            f.write(body)
+        os.replace(tmp, self.snap_path)   # a torn write fails the CRC and is ignored
+        with self._lock:
+            if self._ino == ino:
+                self._snap_offset = offset
+        return True
+
+    def drop_snapshot(self) -> None:
+        self.snap_path.unlink(missing_ok=True)
+        self._snap_offset = 0
+
+    def _ensure_fresh(self) -> None:
+        st = self._stat()
+        if st is None:
+            self._reset()
+            self._ino = self._mtime_ns = None
+            self._loaded = True
+            return
+        rewritten = (
+            not self._loaded
+            or st.st_ino != self._ino
+            or st.st_size < self._offset
+            or (st.st_size == self._offset and st.st_mtime_ns != self._mtime_ns)
+        )
+        if rewritten:
+            self._reset()
+            self._snap_offset = 0
+            self._load_snapshot(st)
+        if st.st_size > self._offset:
+            self._read_tail()
+        self._ino = st.st_ino
+        self._mtime_ns = st.st_mtime_ns
+        self._loaded = True
+
+    def _committed(self, start: int, st: os.stat_result, recs: list[dict], sizes: list[int]) -> None:
+        """Apply a just-written batch in place if it directly follows what we
+        have indexed; otherwise the next read tails it from disk."""
+        with self._lock:
+            same_file = self._ino == st.st_ino or (self._ino is None and start == 0)
+            if self._loaded and same_file and self._offset == start:
+                pos = start
+                for r, size in zip(recs, sizes):
+                    self._put(r, pos)
+                    pos += size
+                self._offset = st.st_size
+                self._ino = st.st_ino
+                self._mtime_ns = st.st_mtime_ns
+
+    # ── public API (all return snapshots, safe to iterate) ───────────────
+
+    def get(self, rid: str) -> dict | None:
+        with self._lock:
+            self._ensure_fresh()
+            entry = self._records.get(rid)
+            return self._rec(entry) if entry is not None else None
+
+    def has(self, rid: str) -> bool:
+        with self._lock:
+            self._ensure_fresh()
+            return rid in self._records
+
+    def ids(self) -> list[str]:
+        with self._lock:
+            self._ensure_fresh()
+            return list(self._records)
+
+    def all(self) -> list[dict]:
+        with self._lock:
+            self._ensure_fresh()
+            return [self._rec(e) for e in self._records.values()]
+
+    def lookup(self, key: str, value: str) -> list[dict]:
+        """Latest records whose ``key`` field equals ``value``."""
+        with self._lock:
+            self._ensure_fresh()
+            ids = self._by[key].get(value, ())
+            return [self._rec(self._records[i]) for i in ids]
+
+    def in_container(self, container_id: str) -> list[dict]:
+        return self.lookup("container_id", container_id)
+
+    def append(self, rec: dict) -> None:
+        self.append_many([rec])
+
+    def append_many(self, recs: list[dict]) -> None:
+        """Append records; concurrent callers share one write (group commit)."""
+        if not recs:
+            return
+        lines = [codec.dumps(r) + b"\n" for r in recs]
+        self._writer.write(b"".join(lines), recs, [len(line) for line in lines])
+
+    def line_count(self) -> int:
+        with self._lock:
+            self._ensure_fresh()
+            return self._lines
+
+    def memory_estimate(self) -> int:
+        """Rough resident bytes.  Lock-free and I/O-free (0 until the file is
+        first read), so it is cheap enough to call on every request."""
+        n, lines, offset = len(self._records), self._lines, self._offset
+        if self.mode == "offsets":
+            return n * _OFFSET_ENTRY_BYTES
+        live_bytes = offset * n // lines if lines else 0
+        return n * _RESIDENT_RECORD_BYTES + live_bytes
+
+    def compact(self, keep: Callable[[dict], bool], extra: list[dict] = ()) -> set[str]:
+        """Rewrite the file to only the latest record per ID that passes
+        ``keep`` (plus ``extra`` records) and atomically swap it in.
+        Returns the IDs dropped."""
+        with self._write_lock, self._lock:
+            self._ensure_fresh()
+            if not self._loaded or self._ino is None:
+                return set()
+            kept: list[dict] = []
+            dropped: set[str] = set()
+            for rid, entry in self._records.items():
+                r = self._rec(entry)
+                if keep(r):
+                    kept.append(r)
+                else:
+                    dropped.add(rid)
+            kept.extend(extra)
+            lines = [codec.dumps(r) + b"\n" for r in kept]
+            tmp = self.path.with_suffix(self.path.suffix + ".compact")
+            with tmp.open("wb") as f:
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self._unmap()                     # Windows cannot replace a mapped file
+            os.replace(tmp, self.path)
+            self.drop_snapshot()              # the compacted file is its own snapshot
+            self._reset()
+            pos = 0
+            for r, line in zip(kept, lines):
+                self._put(r, pos)
+                pos += len(line)
+            st = self._stat()
+            self._offset = st.st_size
+            self._ino = st.st_ino
+            self._mtime_ns = st.st_mtime_ns
+            return dropped
+
+
+class _ChangeLog(_JsonlIndex):
+    """Latest change per record — {entity_id, container_id, kind, op, rev} —
+    backing the graph change feed and the HTTP cache validators.  Container
+    records are logged under the store scope, container_id "".
+
+    Revisions come from one store-wide counter (so they are monotonic per
+    container too) and are assigned under the store lock, after the index has
+    caught up with other processes' appends.  Compaction drops delete entries
+    and leaves a per-container "floor" record: asking for changes older than
+    the floor means the caller must reload the graph, and revisions never go
+    below it.
+    """
+
+    def __init__(self, path: Path, lock: _InterProcessLock, durability: _Durability):
+        super().__init__(path, "entity_id", ("container_id",), lock=lock, durability=durability)
+        self._revision = 0
+        self._revs: dict[tuple[str, str], int] = {}   # (container, kind) → latest rev
+        self._floors: dict[str, int] = {}      # container → oldest rev still answerable
+
+    def _put(self, rec: dict, offset: int) -> None:
+        super()._put(rec, offset)
+        rev, cid = rec["rev"], rec["container_id"]
+        self._revision = max(self._revision, rev)
+        key = (cid, rec["kind"])
+        self._revs[key] = max(self._revs.get(key, 0), rev)
+        if rec["op"] == "floor":
+            self._floors[cid] = max(self._floors.get(cid, 0), rev)
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._revision = 0
+        self._revs.clear()
+        self._floors.clear()
+
+    def record(self, changes: list[tuple[str, str, str, str]]) -> int:
+        """Append (kind, entity_id, container_id, op) entries under one new
+        revision and return it.  Concurrent calls share one group commit;
+        each still gets a revision of its own."""
+        recs = [{"entity_id": eid, "container_id": cid, "kind": kind, "op": op, "rev": 0}
+                for kind, eid, cid, op in changes]
+        self._writer.write(b"", recs, [])
+        return recs[0]["rev"]
+
+    def _prepare_batch(self, batch: list[_PendingWrite]) -> None:
+        """Number a commit round: one revision per ``record`` call, counted on
+        from what the file holds (other processes' appends included)."""
+        with self._lock:
+            self._ensure_fresh()
+            rev = self._revision
+        for p in batch:
+            rev += 1
+            lines = []
+            for r in p.recs:
+                r["rev"] = rev
+                lines.append(codec.dumps(r) + b"\n")
+            p.data = b"".join(lines)
+            p.sizes = [len(line) for line in lines]
+
+    def revision(self, container_id: str, kinds: tuple[str, ...]) -> int:
+        with self._lock:
+            self._ensure_fresh()
+            return self._revision_of(container_id, kinds)
+
+    def _revision_of(self, container_id: str, kinds: tuple[str, ...]) -> int:
+        return max(self._floors.get(container_id, 0),
+                   *(self._revs.get((container_id, k), 0) for k in kinds))
+
+    def since(self, container_id: str, since: int,
+              kinds: tuple[str, ...] = ("node", "edge")) -> tuple[int, list[dict]] | None:
+        """(revision, ``kinds`` entries newer than ``since``), or None when
+        ``since`` predates the floor."""
+        with self._lock:
+            self._ensure_fresh()
+            if since < self._floors.get(container_id, 0):
+                return None
+            entries = [r for r in self.lookup("container_id", container_id)
+                       if r["rev"] > since and r["kind"] in kinds]
+            return self._revision_of(container_id, kinds), entries
+
+    def compact(self, keep: Callable[[dict], bool], extra: list[dict] = ()) -> set[str]:
+        with self._write_lock, self._lock:
+            self._ensure_fresh()
+            floors = dict(self._floors)
+            for r in self._records.values():
+                if r["op"] != "floor" and (r["op"] == "delete" or not keep(r)):
+                    cid = r["container_id"]
+                    floors[cid] = max(floors.get(cid, 0), r["rev"])
+            floor_recs = [{"entity_id": f"~floor:{cid}", "container_id": cid, "kind": "",
+                           "op": "floor", "rev": rev} for cid, rev in floors.items()]
+            return super().compact(lambda r: r["op"] == "upsert" and keep(r),
+                                   [*extra, *(f for f in floor_recs if keep(f))])
+
+
+# Index modes → snapshot magic.
+_INDEX_MODES = {
+    "resident": b"RKSNAP\x00\x01",
+    "offsets":  b"RKIDX\x00\x00\x01",
+}
+_SNAP_HEADER = struct.Struct("<QQQQII")      # ino, offset, lines, body len, body crc, tail crc
+_SNAP_FINGERPRINT_BYTES = 4096
+
+# Per-record memory overhead used by memory_estimate (measured on CPython 3.11):
+# a decoded record costs about this much on top of its JSON size; an offsets
+# entry (id, offset tuple, secondary-index slots) about this much in total.
+_RESIDENT_RECORD_BYTES = 1000
+_OFFSET_ENTRY_BYTES = 550
+
+
+# Child entity kinds stored per container → (ID field, indexed fields).
+_CHILD_KINDS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "sources": ("source_id", ("container_id",)),
+    "nodes":   ("node_id",   ("container_id",)),
+    "edges":   ("edge_id",   ("container_id", "source_node_id", "target_node_id")),
+}
+
+_UNSAFE_PATH_CHARS = re.compile(r"[^A-Za-z0-9_-]")
 
 
 class FileStorage(AbstractStorage):
     """JSONL-based file storage.  One file per entity type.
     Strategy: append-only; latest record by ID wins on read.
-    Deletions tracked via a tombstone set stored in a sidecar file.
+    Deletions are tombstones: each delete appends IDs to deleted_ids.log,
+    which is periodically folded into the deleted_ids.json snapshot.
+    Each file is served from a resident _JsonlIndex, so reads only parse the
+    lines appended since the previous read.
+
+    ``durability`` picks the fsync policy for appends: "none" | "batch" |
+    "always" (see _Durability).  ``index_mode`` is "resident" (records kept
+    in memory) or "offsets" (only byte offsets; point reads mmap the file —
+    see _JsonlIndex), for workers serving many large stores.
+
+    All writes (appends, tombstones, compaction, migration) hold one store
+    lock — data_dir/.lock, flock'ed across processes — so several uvicorn
+    workers can share a data dir; each worker tails what the others append.
+
+    Layouts:
+      flat    — sources/nodes/edges.jsonl shared by all containers (default)
+      sharded — containers/{container_id}/{sources,nodes,edges}.jsonl, so
+                opening one mindmap only reads that mindmap's files
+    ``layout=None`` picks "sharded" if a containers/ directory exists.
+    Opening a flat store with ``layout="sharded"`` migrates it in place.
     """
 
-    def __init__(self, data_dir: Path):
+    def __init__(self, data_dir: Path, layout: str | None = None, durability: str = "none",
+                 fsync_interval_ms: float = 50, fsync_batch_records: int = 100,
+                 index_mode: str = "resident"):
+        if index_mode not in _INDEX_MODES:
+            raise ValueError(f"Unknown index mode: {index_mode}")
         data_dir.mkdir(parents=True, exist_ok=True)
         self._dir = data_dir
 
         self._containers_path  = data_dir / "containers.jsonl"
-        self._sources_path     = data_dir / "sources.jsonl"
-        self._nodes_path       = data_dir / "nodes.jsonl"
-        self._edges_path       = data_dir / "edges.jsonl"
-        self._deleted_path     = data_dir / "deleted_ids.json"
+        self._shards_dir       = data_dir / "containers"
+        self._deleted_path     = data_dir / "deleted_ids.json"   # folded snapshot
+        self._tomb_log_path    = data_dir / "deleted_ids.log"    # appended since snapshot
+        self._routed_path      = data_dir / "changes.routed"     # change log names every shard record
+
+        if layout is None:
+            layout = "sharded" if self._shards_dir.is_dir() else "flat"
+        if layout not in ("flat", "sharded"):
+            raise ValueError(f"Unknown storage layout: {layout}")
+        self._layout = layout
 
-        self._ta_container = TypeAdapter(KnowledgeContainer)
-        self._ta_source    = TypeAdapter(Source)
-        self._ta_node      = TypeAdapter(GraphNode)
-        self._ta_edge      = TypeAdapter(GraphEdge)
+        # Rows are filtered/selected as raw dicts; only returned rows become models.
+        self._load_container = _ModelLoader(KnowledgeContainer)
+        self._load_source    = _ModelLoader(Source)
+        self._load_node      = _ModelLoader(GraphNode)
+        self._load_edge      = _ModelLoader(GraphEdge)
 
-        self._deleted: set[str] = self._load_deleted()
+        self._write_lock = _InterProcessLock(data_dir / ".lock")
+        self._lock = threading.RLock()         # guards in-memory tombstones + shards
+        self._durability = _Durability(durability, fsync_interval_ms / 1000, fsync_batch_records)
+        self._index_mode = index_mode
+
+        self._containers = self._new_index(self._containers_path, "container_id", ("container_id",))
+        self._changes = _ChangeLog(data_dir / "changes.jsonl", self._write_lock, self._durability)
+        self._flat = {kind: self._new_index(data_dir / f"{kind}.jsonl", id_field, keys)
+                      for kind, (id_field, keys) in _CHILD_KINDS.items()}
+        self._shards: dict[str, dict[str, _JsonlIndex]] = {}
+
+        self._deleted: set[str] = set()
+        self._tomb_snapshot_stamp: tuple[int, int] | None = None
+        self._tomb_log_ino: int | None = None
+        self._tomb_offset = 0                  # bytes of deleted_ids.log already applied
+        self._tomb_log_lines = 0
+        self._tomb_loaded = False
+        self._sync_deleted()
+
+        if layout == "sharded" and any(idx.path.exists() for idx in self._flat.values()):
+            self.migrate_to_sharded()
+        if layout == "sharded":
+            self._route_changes()
+
+    @property
+    def data_dir(self) -> Path:
+        return self._dir
 
     # ── internal helpers ──────────────────────────────────────────────────
 
-    def _load_deleted(self) -> set[str]:
-        if self._deleted_path.exists():
-            return set(json.loads(self._deleted_path.read_text(encoding="utf-8")))
-        return set()
+    # Fold the tombstone log into the snapshot once it has this many lines.
+    _TOMBSTONE_FOLD_EVERY = 1000
 
-    def _save_deleted(self) -> None:
-        self._deleted_path.write_text(
-            json.dumps(list(self._deleted), ensure_ascii=False),
-            encoding="utf-8",
-        )
+    @staticmethod
+    def _stat(path: Path):
+        try:
+            return path.stat()
+        except FileNotFoundError:
+            return None
 
-    def _read_jsonl(self, path: Path) -> list[dict]:
-        if not path.exists():
-            return []
-        rows = []
-        for line in path.read_text(encoding="utf-8").splitlines():
-            line = line.strip()
-            if line:
-                rows.append(json.loads(line))
-        return rows
-
-    def _append(self, path: Path, obj: dict) -> None:
-        with path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(obj, ensure_ascii=False, default=str) + "\n")
-
-    def _latest_by_id(self, rows: list[dict], id_field: str) -> dict[str, dict]:
-        """Return the most recent record per ID (last write wins)."""
-        out: dict[str, dict] = {}
-        for r in rows:
-            out[r[id_field]] = r
-        return out
-
-    def _live(self, records: dict[str, dict]) -> list[dict]:
+    def _sync_deleted(self) -> None:
+        """Bring the tombstone set up to date with disk: snapshot + replay of
+        the log, tailing only new log lines when nothing was folded since the
+        last call.  A trailing partial line (crash mid-append) is ignored."""
+        with self._lock:
+            snap = self._stat(self._deleted_path)
+            log = self._stat(self._tomb_log_path)
+            snap_stamp = (snap.st_ino, snap.st_mtime_ns) if snap else None
+            log_ino = log.st_ino if log else None
+            if (not self._tomb_loaded
+                    or snap_stamp != self._tomb_snapshot_stamp
+                    or log_ino != self._tomb_log_ino
+                    or (log is not None and log.st_size < self._tomb_offset)):
+                deleted: set[str] = set()
+                if snap is not None:
+                    deleted.update(codec.loads(self._deleted_path.read_bytes()))
+                self._deleted = deleted
+                self._tomb_offset = 0
+                self._tomb_log_lines = 0
+            if log is not None and log.st_size > self._tomb_offset:
+                with self._tomb_log_path.open("rb") as f:
+                    f.seek(self._tomb_offset)
+                    chunk = f.read()
+                end = chunk.rfind(b"\n") + 1
+                lines = chunk[:end].decode("utf-8").split("\n")[:-1]
+                self._deleted.update(i for i in lines if i)
+                self._tomb_offset += end
+                self._tomb_log_lines += len(lines)
+            self._tomb_snapshot_stamp = snap_stamp
+            self._tomb_log_ino = log_ino
+            self._tomb_loaded = True
+
+    def _tombstone(self, ids) -> None:
+        """Durably mark IDs as deleted: one appended line per new ID.  A torn
+        last line (crash mid-append) is cut off first."""
+        with self._write_lock, self._lock:
+            self._sync_deleted()
+            new = [i for i in dict.fromkeys(ids) if i not in self._deleted]
+            if not new:
+                return
+            data = "".join(i + "\n" for i in new).encode("utf-8")
+            with self._tomb_log_path.open("a+b") as f:
+                start = _drop_torn_tail(f)     # never glue an ID onto a torn one
+                f.write(data)
+                f.flush()
+                self._durability.written(f.fileno(), self._tomb_log_path, len(new))
+                st = os.fstat(f.fileno())
+            self._deleted.update(new)
+            self._tomb_offset = start + len(data)
+            self._tomb_log_ino = st.st_ino
+            self._tomb_log_lines += len(new)
+            if self._tomb_log_lines >= self._TOMBSTONE_FOLD_EVERY:
+                self._fold_deleted()
+
+    def _fold_deleted(self) -> None:
+        """Atomically write the full tombstone set as the new snapshot, then
+        swap in an empty log.  A crash in between only leaves redundant log
+        lines."""
+        with self._write_lock, self._lock:
+            tmp = self._deleted_path.with_suffix(".json.tmp")
+            with tmp.open("wb") as f:
+                f.write(codec.dumps(list(self._deleted)))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._deleted_path)
+            tmp_log = self._tomb_log_path.with_suffix(".log.tmp")
+            tmp_log.write_bytes(b"")
+            os.replace(tmp_log, self._tomb_log_path)
+            self._sync_deleted()
+
+    def _new_index(self, path: Path, id_field: str, keys: tuple[str, ...]) -> _JsonlIndex:
+        return _JsonlIndex(path, id_field, keys, lock=self._write_lock, durability=self._durability,
+                           mode=self._index_mode)
+
+    def _child_index(self, kind: str, container_id: str) -> _JsonlIndex:
+        """Index holding ``kind`` records of one container."""
+        if self._layout == "flat":
+            return self._flat[kind]
+        with self._lock:
+            shard = self._shards.get(container_id)
+            if shard is None:
+                shard_dir = self._shard_dir(container_id)
+                shard = {kind: self._new_index(shard_dir / f"{kind}.jsonl", id_field, keys)
+                         for kind, (id_field, keys) in _CHILD_KINDS.items()}
+                self._shards[container_id] = shard
+            return shard[kind]
+
+    def _shard_dir(self, container_id: str) -> Path:
+        return self._shards_dir / _UNSAFE_PATH_CHARS.sub("_", container_id)
+
+    def _child_indexes(self, kind: str, open_only: bool = False) -> list[_JsonlIndex]:
+        """Every index holding ``kind`` records; already-opened shards first.
+        ``open_only`` skips shards nothing has loaded yet."""
+        if self._layout == "flat":
+            return [self._flat[kind]]
+        with self._lock:
+            on_disk = [p.name for p in self._shards_dir.iterdir() if p.is_dir()] \
+                if self._shards_dir.is_dir() and not open_only else []
+            return [self._child_index(kind, cid) for cid in dict.fromkeys([*self._shards, *on_disk])]
+
+    def _has_unloaded_shards(self) -> bool:
+        if self._layout == "flat" or not self._shards_dir.is_dir():
+            return False
+        with self._lock:
+            loaded = {self._shard_dir(cid) for cid in self._shards}
+        return any(p.is_dir() and p not in loaded for p in self._shards_dir.iterdir())
+
+    def _close_shards(self, keep) -> None:
+        """Forget shards opened since ``keep`` was taken (a full maintenance
+        pass), so they do not stay resident."""
+        with self._lock:
+            for cid in [c for c in self._shards if c not in keep]:
+                del self._shards[cid]
+
+    def _find(self, kind: str, rid: str) -> dict | None:
+        """Latest live ``kind`` record with ID ``rid``.  In the sharded layout
+        the change log says which container holds it, so only that shard is
+        read."""
+        self._sync_deleted()
+        if rid in self._deleted:
+            return None
+        if self._layout == "flat":
+            return self._flat[kind].get(rid)
+        entry = self._changes.get(rid)
+        if entry is None:
+            return self._find_unrouted(kind, rid)
+        if entry["kind"] != kind[:-1]:
+            return None
+        return self._child_index(kind, entry["container_id"]).get(rid)
+
+    def _find_unrouted(self, kind: str, rid: str) -> dict | None:
+        """``_find`` for an ID the change log does not name: usually an unknown
+        ID, but also a record whose change entry never got written (crash
+        between the data append and ``_log``).  Loaded shards are checked in
+        memory and the others by a byte search of their files, so a miss
+        loads nothing; a hit gets its change entry written."""
+        id_field = _CHILD_KINDS[kind][0]
+        with self._lock:
+            opened = dict(self._shards)
+        row = next((r for shard in opened.values() if (r := shard[kind].get(rid)) is not None), None)
+        if row is None and self._shards_dir.is_dir():
+            loaded = {self._shard_dir(cid) for cid in opened}
+            for shard_dir in self._shards_dir.iterdir():
+                if not shard_dir.is_dir() or shard_dir in loaded:
+                    continue
+                found = _scan_for_record(shard_dir / f"{kind}.jsonl", id_field, rid)
+                if found is not None:
+                    row = self._child_index(kind, found["container_id"]).get(rid)
+                    break
+        if row is not None:
+            self._changes.record([(kind[:-1], rid, row["container_id"], "upsert")])
+        return row
+
+    def _route_changes(self) -> None:
+        """Make sure the change log has an entry for every shard record, which
+        ``_find`` relies on.  Stores sharded before the change log existed are
+        scanned once, one shard at a time; a marker file records that."""
+        if self._routed_path.exists():
+            return
+        with self._write_lock, self._lock:
+            if self._routed_path.exists():
+                return
+            shard_dirs = [p for p in self._shards_dir.iterdir() if p.is_dir()] \
+                if self._shards_dir.is_dir() else []
+            for shard_dir in shard_dirs:
+                missing = []
+                for kind, (id_field, keys) in _CHILD_KINDS.items():
+                    idx = self._new_index(shard_dir / f"{kind}.jsonl", id_field, keys)
+                    missing += [(kind[:-1], r[id_field], r["container_id"], "upsert")
+                                for r in idx.all() if not self._changes.has(r[id_field])]
+                if missing:
+                    self._changes.record(missing)
+            self._routed_path.touch()
+
+    def _indexes(self, open_only: bool = False) -> list[_JsonlIndex]:
+        return [self._containers,
+                *(idx for kind in _CHILD_KINDS for idx in self._child_indexes(kind, open_only))]
+
+    def _live(self, rows: list[dict], id_field: str) -> list[dict]:
         """Filter out deleted IDs."""
-        return [v for k, v in records.items() if k not in self._deleted]
+        self._sync_deleted()
+        deleted = self._deleted
+        return [r for r in rows if r[id_field] not in deleted]
+
+    def _live_one(self, index: _JsonlIndex, rid: str) -> dict | None:
+        self._sync_deleted()
+        if rid in self._deleted:
+            return None
+        return index.get(rid)
 
     # ── CONTAINERS ────────────────────────────────────────────────────────
 
     def list_containers(self) -> list[KnowledgeContainer]:
-        rows = self._latest_by_id(self._read_jsonl(self._containers_path), "container_id")
-        live = self._live(rows)
-        result = [self._ta_container.validate_python(r) for r in live]
+        live = self._live(self._containers.all(), "container_id")
+        result = self._load_container.many(live)
         return sorted(result, key=lambda c: c.created_at)
 
     def upsert_container(self, c: KnowledgeContainer) -> None:
-        self._append(self._containers_path, c.model_dump(mode="json"))
+        self._containers.append(c.model_dump(mode="json"))
+        self._log([("container", c.container_id, "", "upsert")])
 
     def get_container(self, container_id: str) -> KnowledgeContainer | None:
-        rows = self._latest_by_id(self._read_jsonl(self._containers_path), "container_id")
-        r = rows.get(container_id)
-        if r and container_id not in self._deleted:
-            return self._ta_container.validate_python(r)
-        return None
+        r = self._live_one(self._containers, container_id)
+        return self._load_container.one(r) if r else None
 
     def delete_container(self, container_id: str) -> None:
-        self._deleted.add(container_id)
         # Also tombstone all children
-        for s in self.list_sources(container_id):
-            self._deleted.add(s.source_id)
-        for n in self.list_nodes(container_id):
-            self._deleted.add(n.node_id)
-        for e in self.list_edges(container_id):
-            self._deleted.add(e.edge_id)
-        self._save_deleted()
+        ids = [container_id]
+        for kind, (id_field, _) in _CHILD_KINDS.items():
+            rows = self._child_index(kind, container_id).in_container(container_id)
+            ids.extend(r[id_field] for r in rows)
+        self._tombstone(ids)
+        self._log([("container", container_id, "", "delete")])
 
     # ── SOURCES ───────────────────────────────────────────────────────────
 
     def list_sources(self, container_id: str) -> list[Source]:
-        rows = self._latest_by_id(self._read_jsonl(self._sources_path), "source_id")
-        live = [self._ta_source.validate_python(v) for v in self._live(rows)]
-        return sorted([s for s in live if s.container_id == container_id], key=lambda s: s.created_at)
+        live = self._live(self._child_index("sources", container_id).in_container(container_id), "source_id")
+        result = self._load_source.many(live)
+        return sorted(result, key=lambda s: s.created_at)
 
     def upsert_source(self, s: Source) -> None:
-        self._append(self._sources_path, s.model_dump(mode="json"))
+        self._child_index("sources", s.container_id).append(s.model_dump(mode="json"))
+        self._log([("source", s.source_id, s.container_id, "upsert")])
 
     def delete_source(self, source_id: str) -> None:
-        self._deleted.add(source_id)
-        self._save_deleted()
+        source = self._find("sources", source_id)
+        self._tombstone([source_id])
+        if source is not None:
+            self._log([("source", source_id, source["container_id"], "delete")])
 
     # ── NODES ─────────────────────────────────────────────────────────────
 
     def list_nodes(self, container_id: str) -> list[GraphNode]:
-        rows = self._latest_by_id(self._read_jsonl(self._nodes_path), "node_id")
-        live = [self._ta_node.validate_python(v) for v in self._live(rows)]
-        return sorted([n for n in live if n.container_id == container_id], key=lambda n: n.created_at)
+        live = self._live(self._child_index("nodes", container_id).in_container(container_id), "node_id")
+        result = self._load_node.many(live)
+        return sorted(result, key=lambda n: n.created_at)
+
+    def list_node_rows(self, container_id: str) -> list[dict]:
+        live = self._live(self._child_index("nodes", container_id).in_container(container_id), "node_id")
+        # model_dump(mode="json") writes ISO-8601, so the strings sort chronologically
+        return sorted(self._load_node.rows(live), key=lambda r: r["created_at"])
 
     def get_node(self, node_id: str) -> GraphNode | None:
-        rows = self._latest_by_id(self._read_jsonl(self._nodes_path), "node_id")
-        r = rows.get(node_id)
-        if r and node_id not in self._deleted:
-            return self._ta_node.validate_python(r)
-        return None
+        r = self._find("nodes", node_id)
+        return self._load_node.one(r) if r else None
 
     def upsert_node(self, node: GraphNode) -> None:
-        self._append(self._nodes_path, node.model_dump(mode="json"))
+        self._child_index("nodes", node.container_id).append(node.model_dump(mode="json"))
+        self._log([("node", node.node_id, node.container_id, "upsert")])
 
     def delete_node(self, node_id: str) -> None:
         """Delete node + all its edges."""
-        # Collect edges BEFORE marking as deleted (get_node checks _deleted)
-        node = self.get_node(node_id)
-        if node:
-            edges = self.list_edges(node.container_id)
-            for e in edges:
-                if e.source_node_id == node_id or e.target_node_id == node_id:
-                    self._deleted.add(e.edge_id)
-        self._deleted.add(node_id)
-        self._save_deleted()
-
-    def delete_node_cascade(self, node_id: str) -> list[str]:
+        # Collect edges BEFORE marking as deleted (_find checks _deleted)
+        node = self._find("nodes", node_id)
+        edge_ids = [e["edge_id"] for e in self._edge_rows_for_node(node_id, "both")]
+        self._tombstone([*edge_ids, node_id])
+        if node is not None:
+            self._record_deletes(node["container_id"], [node_id], edge_ids)
+
+    def delete_node_cascade(self, node_id: str) -> tuple[list[str], list[str]]:
         """Delete node and all purely-downstream nodes (only 1 incoming edge from this node).
-        Returns list of all deleted node_ids."""
-        node = self.get_node(node_id)
-        if not node:
-            return []
+        Returns (deleted node_ids, deleted edge_ids).
 
-        all_nodes = self.list_nodes(node.container_id)
-        all_edges = self.list_edges(node.container_id)
+        Walks the adjacency index breadth-first, so the cost is proportional to
+        the edges around the deleted subtree; tombstones are persisted once."""
+        node = self._find("nodes", node_id)
+        if node is None:
+            return [], []
+        edges = self._child_index("edges", node["container_id"])
 
-        # Build incoming edge count per node
-        incoming: dict[str, list[str]] = {n.node_id: [] for n in all_nodes}
-        for e in all_edges:
-            if e.target_node_id in incoming:
-                incoming[e.target_node_id].append(e.source_node_id)
+        def adjacent(key: str, nid: str) -> list[dict]:
+            return self._live(edges.lookup(key, nid), "edge_id")
 
-        # BFS from node_id following outgoing edges
         to_delete: list[str] = []
-        queue = [node_id]
+        edge_ids: dict[str, None] = {}
+        queue = deque([node_id])
         visited: set[str] = set()
 
         while queue:
-            current = queue.pop(0)
+            current = queue.popleft()
             if current in visited:
                 continue
             visited.add(current)
             to_delete.append(current)
-
-            # Find children via outgoing edges
-            children = [e.target_node_id for e in all_edges if e.source_node_id == current]
-            for child in children:
+            for e in adjacent("target_node_id", current):
+                edge_ids[e["edge_id"]] = None
+            for e in adjacent("source_node_id", current):
+                edge_ids[e["edge_id"]] = None
+                child = e["target_node_id"]
+                if child in self._deleted:
+                    continue
                 # Only cascade-delete if this node is the ONLY parent
-                parents = incoming.get(child, [])
-                if len(parents) == 1 and parents[0] == current:
+                parents = adjacent("target_node_id", child)
+                if len(parents) == 1 and parents[0]["source_node_id"] == current:
                     queue.append(child)
 
-        for nid in to_delete:
-            self.delete_node(nid)
-
-        return to_delete
+        self._tombstone([*edge_ids, *to_delete])
+        self._record_deletes(node["container_id"], to_delete, list(edge_ids))
+        return to_delete, list(edge_ids)
 
     # ── EDGES ─────────────────────────────────────────────────────────────
 
     def list_edges(self, container_id: str) -> list[GraphEdge]:
-        rows = self._latest_by_id(self._read_jsonl(self._edges_path), "edge_id")
-        live = [self._ta_edge.validate_python(v) for v in self._live(rows)]
-        return [e for e in live if e.container_id == container_id]
+        live = self._live(self._child_index("edges", container_id).in_container(container_id), "edge_id")
+        return self._load_edge.many(live)
+
+    def list_edge_rows(self, container_id: str) -> list[dict]:
+        live = self._live(self._child_index("edges", container_id).in_container(container_id), "edge_id")
+        return self._load_edge.rows(live)
 
     def get_edge(self, edge_id: str) -> GraphEdge | None:
-        rows = self._latest_by_id(self._read_jsonl(self._edges_path), "edge_id")
-        r = rows.get(edge_id)
-        if r and edge_id not in self._deleted:
-            return self._ta_edge.validate_python(r)
-        return None
+        r = self._find("edges", edge_id)
+        return self._load_edge.one(r) if r else None
 
     def upsert_edge(self, edge: GraphEdge) -> None:
-        self._append(self._edges_path, edge.model_dump(mode="json"))
+        self._child_index("edges", edge.container_id).append(edge.model_dump(mode="json"))
+        self._log([("edge", edge.edge_id, edge.container_id, "upsert")])
 
     def delete_edge(self, edge_id: str) -> None:
-        self._deleted.add(edge_id)
-        self._save_deleted()
+        edge = self._find("edges", edge_id)
+        self._tombstone([edge_id])
+        if edge is not None:
+            self._record_deletes(edge["container_id"], [], [edge_id])
+
+    # ── BULK ──────────────────────────────────────────────────────────────
+
+    def upsert_many(self, nodes: list[GraphNode] = (), edges: list[GraphEdge] = (),
+                    sources: list[Source] = ()) -> None:
+        """One buffered append per touched file."""
+        batches: dict[int, tuple[_JsonlIndex, list[dict]]] = {}
+        for kind, items in (("sources", sources), ("nodes", nodes), ("edges", edges)):
+            for item in items:
+                idx = self._child_index(kind, item.container_id)
+                batches.setdefault(id(idx), (idx, []))[1].append(item.model_dump(mode="json"))
+        for idx, rows in batches.values():
+            idx.append_many(rows)
+        changes = [("source", s.source_id, s.container_id, "upsert") for s in sources]
+        changes += [("node", n.node_id, n.container_id, "upsert") for n in nodes]
+        changes += [("edge", e.edge_id, e.container_id, "upsert") for e in edges]
+        if changes:
+            self._log(changes)
+
+    def _edge_rows_for_node(self, node_id: str, direction: str) -> list[dict]:
+        if direction not in ("out", "in", "both"):
+            raise ValueError(f"Unknown edge direction: {direction}")
+        node = self._find("nodes", node_id)
+        if node is None:
+            return []
+        idx = self._child_index("edges", node["container_id"])
+        rows: dict[str, dict] = {}
+        if direction in ("out", "both"):
+            rows.update((r["edge_id"], r) for r in idx.lookup("source_node_id", node_id))
+        if direction in ("in", "both"):
+            rows.update((r["edge_id"], r) for r in idx.lookup("target_node_id", node_id))
+        return self._live(list(rows.values()), "edge_id")
+
+    def list_edges_for_node(self, node_id: str, direction: str = "both") -> list[GraphEdge]:
+        return self._load_edge.many(self._edge_rows_for_node(node_id, direction))
+
+    def edge_count(self, node_id: str) -> int:
+        return len(self._edge_rows_for_node(node_id, "both"))
+
+    # ── CHANGE FEED ───────────────────────────────────────────────────────
+
+    def _log(self, changes: list[tuple[str, str, str, str]]) -> None:
+        rev = self._changes.record(changes)
+        self._emit_changes(dict.fromkeys(cid for _, _, cid, _ in changes), rev)
+
+    def _record_deletes(self, container_id: str, node_ids: list[str], edge_ids: list[str]) -> None:
+        changes = [("node", i, container_id, "delete") for i in node_ids]
+        changes += [("edge", i, container_id, "delete") for i in edge_ids]
+        if changes:
+            self._log(changes)
+
+    def container_revision(self, container_id: str, kinds: tuple[str, ...] = ("node", "edge")) -> int:
+        return self._changes.revision(container_id, kinds)
+
+    def store_revision(self) -> int:
+        return self._changes.revision("", ("container",))
+
+    def container_of(self, entity_id: str) -> str | None:
+        self._sync_deleted()
+        if entity_id in self._deleted:
+            return None
+        entry = self._changes.get(entity_id)
+        return entry["container_id"] if entry is not None and entry["op"] == "upsert" else None
+
+    def changes_since(self, container_id: str, since: int) -> dict | None:
+        found = self._changes.since(container_id, since)
+        if found is None:
+            return None
+        revision, entries = found
+        result = {"revision": revision, "nodes": [], "edges": [],
+                  "deleted_node_ids": [], "deleted_edge_ids": []}
+        for kind, load in (("node", self._load_node), ("edge", self._load_edge)):
+            index = self._child_index(f"{kind}s", container_id)
+            rows = []
+            for e in entries:
+                if e["kind"] != kind:
+                    continue
+                row = self._live_one(index, e["entity_id"]) if e["op"] == "upsert" else None
+                if row is None:            # deleted (possibly after the entry was read)
+                    result[f"deleted_{kind}_ids"].append(e["entity_id"])
+                else:
+                    rows.append(row)
+            result[f"{kind}s"] = load.rows(rows)
+        return result
+
+    # ── MAINTENANCE ───────────────────────────────────────────────────────
+
+    def durability_stats(self) -> dict:
+        """fsync mode + flush latency counters."""
+        return self._durability.stats()
+
+    def memory_estimate(self) -> int:
+        indexes = [self._containers, self._changes, *self._flat.values(),
+                   *(idx for shard in list(self._shards.values()) for idx in shard.values())]
+        return sum(idx.memory_estimate() for idx in indexes)
+
+    def compaction_stats(self, open_only: bool = False) -> dict[str, int]:
+        """Record counts across all JSONL files: total lines vs. live records.
+        ``open_only`` counts only shards already loaded (no extra I/O)."""
+        total = live = 0
+        self._sync_deleted()
+        for idx in self._indexes(open_only):
+            total += idx.line_count()
+            live += sum(1 for i in idx.ids() if i not in self._deleted)
+        return {"total_records": total, "live_records": live, "dead_records": total - live}
+
+    def compact(self, open_only: bool = False) -> dict[str, int]:
+        """Rewrite every JSONL file to the latest live record per ID, then drop
+        the tombstones that no longer shadow anything on disk.
+
+        ``open_only`` rewrites only the shards already loaded; while some
+        shard on disk is not loaded that pass keeps every tombstone, since an
+        ID may still appear in a shard it did not read.  In the flat layout,
+        or with every shard loaded, it is a full pass.  A full pass forgets
+        the shards it had to open once it is done."""
+        with self._write_lock, self._lock:
+            opened = set(self._shards)
+            open_only = open_only and self._has_unloaded_shards()
+            before = self.compaction_stats(open_only)
+            self._changes.compact(lambda r: r["entity_id"] not in self._deleted
+                                  and r["container_id"] not in self._deleted)
+            dropped: set[str] = set()
+            for idx in self._indexes(open_only):
+                dropped |= idx.compact(lambda r, f=idx.id_field: r[f] not in self._deleted)
+            if not open_only:
+                self._deleted -= dropped
+                # Tombstones for IDs that no file mentions anymore are useless too.
+                orphans = {i for i in list(self._deleted)
+                           if not any(idx.has(i) for idx in self._indexes())}
+                self._deleted -= orphans
+                self._fold_deleted()
+            after = self.compaction_stats(open_only)
+            self._close_shards(opened)
+        return {"removed_records": before["total_records"] - after["total_records"], **after}
+
+    def maybe_compact(self, dead_ratio: float = 0.5, min_records: int = 1000,
+                      open_only: bool = False) -> dict[str, int] | None:
+        """Compact only when at least ``min_records`` lines exist and the share
+        of superseded/deleted lines reaches ``dead_ratio``.  ``open_only``
+        looks at (and rewrites) only the shards already loaded."""
+        stats = self.compaction_stats(open_only)
+        total = stats["total_records"]
+        if total < min_records or total == 0 or stats["dead_records"] / total < dead_ratio:
+            return None
+        return self.compact(open_only)
+
+    def snapshot(self, min_lag_bytes: int = 1) -> dict[str, int]:
+        """Write a cold-start snapshot for every loaded file whose
+        unsnapshotted JSONL tail is at least ``min_lag_bytes`` long.  Shards
+        nothing has opened are skipped; they have nothing new in memory."""
+        written = skipped = 0
+        for idx in [self._changes, *self._indexes(open_only=True)]:
+            if idx.snapshot_lag() >= max(1, min_lag_bytes) and idx.save_snapshot():
+                written += 1
+            else:
+                skipped += 1
+        return {"snapshots_written": written, "snapshots_skipped": skipped}
+
+    def migrate_to_sharded(self) -> dict[str, int]:
+        """Split flat sources/nodes/edges.jsonl into per-container shards.
+
+        Only the latest live record per ID is copied.  The flat files are
+        renamed to ``*.jsonl.migrated`` afterwards (delete them manually once
+        verified).  Returns the number of records moved per kind.
+        """
+        moved: dict[str, int] = {}
+        with self._write_lock, self._lock:
+            self._layout = "sharded"
+            self._shards_dir.mkdir(exist_ok=True)
+            for kind, flat in self._flat.items():
+                if not flat.path.exists():
+                    continue
+                by_container: dict[str, list[dict]] = {}
+                for r in self._live(flat.all(), flat.id_field):
+                    by_container.setdefault(r["container_id"], []).append(r)
+                for cid, rows in by_container.items():
+                    self._child_index(kind, cid).append_many(rows)
+                    # Route the moved records (flat data may predate the change log)
+                    unrouted = [(kind[:-1], r[flat.id_field], cid, "upsert") for r in rows
+                                if not self._changes.has(r[flat.id_field])]
+                    if unrouted:
+                        self._changes.record(unrouted)
+                flat._release_map()           # Windows cannot rename a mapped file
+                flat.path.rename(flat.path.with_suffix(".jsonl.migrated"))
+                flat.drop_snapshot()
+                moved[kind] = sum(len(rows) for rows in by_container.values())
+        return moved
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from rks.models import KnowledgeContainer
+
+
+@pytest.fixture
+def make_container():
+    """``make_container(storage)`` → ID of a fresh container in ``storage``."""
+    def make(storage, title: str = "c") -> str:
+        c = KnowledgeContainer(title=title)
+        storage.upsert_container(c)
+        return c.container_id
+    return make
+
+
+def parse_lines(path: Path) -> list[dict]:
+    """Every line of a JSONL file, decoded (fails on a torn or glued line)."""
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import pytest
+
+from rks.models import GraphEdge, GraphNode
+from rks.sqlite_storage import SqliteStorage
+from rks.storage import FileStorage
+
+
+@pytest.fixture(params=["flat", "sharded", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "sqlite":
+        return SqliteStorage(tmp_path / "store.sqlite3")
+    return FileStorage(tmp_path, layout=request.param)
+
+
+def _link(cid: str, a: GraphNode, b: GraphNode) -> GraphEdge:
+    return GraphEdge(container_id=cid, source_node_id=a.node_id, target_node_id=b.node_id)
+
+
+def test_cascade_stops_at_nodes_with_other_parents(storage, make_container):
+    cid = make_container(storage)
+    root, a, b, c, d, shared = (GraphNode(container_id=cid, title=t) for t in "RabcdS")
+    edges = [_link(cid, root, a), _link(cid, root, b), _link(cid, a, c), _link(cid, c, d),
+             _link(cid, a, shared), _link(cid, b, shared)]
+    storage.upsert_many(nodes=[root, a, b, c, d, shared], edges=edges)
+
+    deleted_nodes, deleted_edges = storage.delete_node_cascade(a.node_id)
+    assert set(deleted_nodes) == {a.node_id, c.node_id, d.node_id}
+    assert set(deleted_edges) == {edges[0].edge_id, edges[2].edge_id, edges[3].edge_id, edges[4].edge_id}
+    assert {n.title for n in storage.list_nodes(cid)} == {"R", "b", "S"}
+    assert storage.edge_count(shared.node_id) == 1
+    assert storage.delete_node_cascade("N_missing") == ([], [])
+
+
+def test_cascade_over_a_long_chain(storage, make_container):
+    cid = make_container(storage)
+    chain = [GraphNode(container_id=cid, title=str(i)) for i in range(3000)]
+    storage.upsert_many(nodes=chain, edges=[_link(cid, a, b) for a, b in zip(chain, chain[1:])])
+    deleted_nodes, deleted_edges = storage.delete_node_cascade(chain[1].node_id)
+    assert len(deleted_nodes) == 2999 and len(deleted_edges) == 2999
+    assert [n.title for n in storage.list_nodes(cid)] == ["0"]
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from conftest import parse_lines
+
+from rks.models import GraphNode
+from rks.storage import FileStorage
+
+
+def _tombstones_on_disk(path) -> set[str]:
+    snap = path / "deleted_ids.json"
+    log = path / "deleted_ids.log"
+    ids = set(json.loads(snap.read_text())) if snap.exists() else set()
+    return ids | (set(log.read_text().split()) if log.exists() else set())
+
+
+@pytest.fixture
+def churned(tmp_path, make_container):
+    storage = FileStorage(tmp_path)
+    cid = make_container(storage)
+    nodes = [GraphNode(container_id=cid, title=str(i)) for i in range(100)]
+    storage.upsert_many(nodes=nodes)
+    for n in nodes[:80]:
+        storage.delete_node(n.node_id)
+    return storage, cid, nodes
+
+
+def test_maybe_compact_respects_thresholds(churned):
+    storage, _, _ = churned
+    assert storage.maybe_compact(dead_ratio=0.5, min_records=10_000) is None
+    assert storage.maybe_compact(dead_ratio=0.99, min_records=10) is None
+    assert storage.compaction_stats()["dead_records"] == 80
+
+
+@pytest.mark.parametrize("open_only", [False, True])
+def test_compaction_drops_dead_lines_and_prunes_tombstones(tmp_path, churned, open_only):
+    storage, cid, nodes = churned
+    revision = storage.container_revision(cid)
+    result = storage.maybe_compact(dead_ratio=0.5, min_records=10, open_only=open_only)
+
+    assert result["removed_records"] == 80 and result["dead_records"] == 0
+    assert len(parse_lines(tmp_path / "nodes.jsonl")) == 20
+    assert _tombstones_on_disk(tmp_path) == set()
+    reopened = FileStorage(tmp_path)
+    assert {n.title for n in reopened.list_nodes(cid)} == {str(i) for i in range(80, 100)}
+    assert reopened.get_node(nodes[0].node_id) is None
+    assert reopened.container_revision(cid) >= revision
+    assert reopened.changes_since(cid, 0) is None                 # history folded into a floor
+
+
+def test_partial_sharded_pass_keeps_tombstones(tmp_path, make_container):
+    storage = FileStorage(tmp_path, layout="sharded")
+    busy, other = make_container(storage, "busy"), make_container(storage, "other")
+    nodes = [GraphNode(container_id=busy, title=str(i)) for i in range(50)]
+    storage.upsert_many(nodes=nodes)
+    storage.upsert_node(GraphNode(container_id=other, title="o"))
+    for n in nodes[:40]:
+        storage.delete_node(n.node_id)
+
+    partial = FileStorage(tmp_path)
+    partial.list_nodes(busy)                                     # "other" stays unloaded
+    assert partial.maybe_compact(0.5, 10, open_only=True)["removed_records"] == 40
+    assert len(_tombstones_on_disk(tmp_path)) == 40
+    assert partial.get_node(nodes[0].node_id) is None
+
+    full = FileStorage(tmp_path)
+    full.compact()
+    assert _tombstones_on_disk(tmp_path) == set()
+    assert [n.title for n in full.list_nodes(other)] == ["o"]
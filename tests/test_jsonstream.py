@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from rks.jsonstream import JsonStreamScanner
+
+DOC = {
+    "reply": 'Quotes \" and braces } { ] [ inside, plus unicode: tiếng Việt ✓',
+    "suggested_nodes": [
+        {"title": "A", "tags": ["x", "y"], "meta": {"depth": 2}},
+        {"title": "B}", "tags": []},
+        "plain",
+        3.5,
+        None,
+    ],
+    "count": 42,
+    "ok": True,
+    "nested": {"inner": [1, 2, {"k": "v"}]},
+    "empty": [],
+}
+
+
+def _expected(doc: dict) -> list[tuple[tuple, object]]:
+    out = []
+    for key, value in doc.items():
+        if isinstance(value, list):
+            out += [((key, i), v) for i, v in enumerate(value)]
+        out.append(((key,), value))
+    return out
+
+
+def _scan(text: str, cuts: list[int]) -> list[tuple[tuple, object]]:
+    scanner = JsonStreamScanner()
+    out = []
+    for start, stop in zip([0, *cuts], [*cuts, len(text)]):
+        out += scanner.feed(text[start:stop])
+    assert scanner.done
+    return out
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("seed", range(25))
+def test_random_chunking_matches_whole_document(seed, indent):
+    text = "```json\n" + json.dumps(DOC, ensure_ascii=False, indent=indent) + "\n```\ntrailing {junk}"
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, min(60, len(text) - 1))))
+    assert _scan(text, cuts) == _expected(DOC)
+
+
+def test_one_character_at_a_time():
+    text = json.dumps(DOC)
+    assert _scan(text, list(range(1, len(text)))) == _expected(DOC)
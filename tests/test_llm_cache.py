@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from rks import llm_cache
+from rks.llm_cache import ResponseCache
+
+
+def test_key_is_stable_and_covers_every_parameter():
+    params = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.2}
+    reordered = {"temperature": 0.2, "messages": [{"role": "user", "content": "hi"}], "model": "m"}
+    assert ResponseCache.key(params) == ResponseCache.key(reordered)
+    assert ResponseCache.key(params) != ResponseCache.key({**params, "temperature": 0.3})
+
+
+def test_hits_misses_and_reopen(tmp_path):
+    cache = ResponseCache(tmp_path / "llm.db")
+    assert cache.get("k") is None
+    cache.put("k", "trả lời")
+    assert cache.get("k") == "trả lời"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"], stats["entries"]) == (1, 1, 1, 1)
+    assert stats["hit_ratio"] == 0.5 and stats["bytes"] == len("trả lời".encode())
+    assert ResponseCache(tmp_path / "llm.db").get("k") == "trả lời"
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: clock[0])
+    cache = ResponseCache(tmp_path / "llm.db", ttl=60)
+    cache.put("old", "a")
+    clock[0] += 61
+    assert cache.get("old") is None
+    cache.put("stale", "b")
+    clock[0] += 61
+    cache.put("new", "c")                                        # purges "stale" on the way
+    stats = cache.stats()
+    assert stats["expired"] == 2 and stats["entries"] == 1
+    assert cache.get("new") == "c"
+
+
+def test_byte_budget_evicts_least_recently_read(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: clock[0])
+    cache = ResponseCache(tmp_path / "llm.db", max_bytes=250)
+    for key in ("a", "b"):
+        clock[0] += 1
+        cache.put(key, "x" * 100)
+    clock[0] += 1
+    assert cache.get("a") is not None                            # "b" is now the oldest read
+    clock[0] += 1
+    cache.put("c", "x" * 100)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= 250
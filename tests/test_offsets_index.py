@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import pytest
+
+from rks.models import GraphEdge, GraphNode
+from rks.storage import FileStorage
+
+
+@pytest.fixture
+def graph(tmp_path, make_container):
+    storage = FileStorage(tmp_path, index_mode="offsets")
+    cid = make_container(storage)
+    nodes = [GraphNode(container_id=cid, title=f"n{i}", definition="x" * 200) for i in range(30)]
+    edges = [GraphEdge(container_id=cid, source_node_id=a.node_id, target_node_id=b.node_id)
+             for a, b in zip(nodes, nodes[1:])]
+    storage.upsert_many(nodes=nodes, edges=edges)
+    return storage, cid, nodes
+
+
+def test_point_reads_match_resident_mode(tmp_path, graph):
+    storage, cid, nodes = graph
+    resident = FileStorage(tmp_path, index_mode="resident")
+    for n in nodes[::7]:
+        assert storage.get_node(n.node_id) == resident.get_node(n.node_id)
+    assert storage.list_node_rows(cid) == resident.list_node_rows(cid)
+    assert storage.edge_count(nodes[5].node_id) == 2
+    assert storage._flat["nodes"].memory_estimate() < resident._flat["nodes"].memory_estimate()
+
+
+def test_appends_after_mapping_are_readable(graph):
+    storage, cid, nodes = graph
+    assert storage.get_node(nodes[0].node_id) is not None          # maps the file
+    storage.upsert_node(nodes[0].model_copy(update={"title": "renamed"}))
+    late = GraphNode(container_id=cid, title="late")
+    storage.upsert_node(late)
+    assert storage.get_node(nodes[0].node_id).title == "renamed"
+    assert storage.get_node(late.node_id).title == "late"
+
+
+def test_idx_snapshot_and_compaction(tmp_path, graph):
+    storage, cid, nodes = graph
+    storage.snapshot()
+    assert (tmp_path / "nodes.jsonl.idx").exists()
+    storage.upsert_node(GraphNode(container_id=cid, title="tail"))
+    reopened = FileStorage(tmp_path, index_mode="offsets")
+    assert len(reopened.list_nodes(cid)) == 31
+
+    assert reopened.get_node(nodes[3].node_id) is not None         # mapped before the rewrite
+    for n in nodes[:20]:
+        reopened.delete_node(n.node_id)
+    reopened.compact()
+    assert reopened.get_node(nodes[25].node_id).title == "n25"
+    assert len(FileStorage(tmp_path, index_mode="offsets").list_nodes(cid)) == 11
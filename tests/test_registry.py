@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import threading
+
+from rks.models import GraphNode
+from rks.registry import UserRegistry
+
+
+def test_storage_and_agent_are_reused(tmp_path):
+    registry = UserRegistry(tmp_path)
+    storage = registry.storage("alice")
+    assert registry.storage("alice") is storage
+    assert registry.agent("alice").storage is storage
+    assert registry.storage("bob") is not storage
+    assert (tmp_path / "users" / "alice").is_dir()
+    stats = registry.stats()
+    assert (stats["users"], stats["hits"], stats["misses"]) == (2, 2, 2)
+
+
+def test_concurrent_first_requests_open_one_store(tmp_path):
+    registry = UserRegistry(tmp_path)
+    opened = []
+    threads = [threading.Thread(target=lambda: opened.append(registry.storage("alice"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(s) for s in opened}) == 1
+    assert registry.stats()["misses"] == 1
+
+
+def test_lru_and_idle_eviction(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("rks.registry.time.monotonic", lambda: clock[0])
+    registry = UserRegistry(tmp_path, max_users=2, idle_ttl=60)
+    alice = registry.storage("alice")
+    registry.storage("bob")
+    registry.storage("alice")                                    # bob is now least recently used
+    registry.storage("carol")
+    assert registry.storage("alice") is alice
+    assert registry.stats()["evictions"]["lru"] == 1
+
+    clock[0] += 120
+    registry.storage("dave")
+    assert registry.stats()["evictions"]["idle"] == 2 and len(registry) == 1
+    assert registry.storage("alice") is not alice
+
+
+def test_memory_budget_evicts_but_keeps_current_user(tmp_path, make_container):
+    registry = UserRegistry(tmp_path, max_bytes=1)
+    make_container(registry.storage("alice"))
+    make_container(registry.storage("bob"))
+    registry.storage("bob")
+    stats = registry.stats()
+    assert stats["users"] == 1 and stats["evictions"]["memory"] >= 1
+    assert stats["resident_bytes"] > stats["max_bytes"]         # the user being served stays
+
+
+def test_subscribers_pin_their_store_and_get_changes(tmp_path, make_container):
+    registry = UserRegistry(tmp_path, max_users=1, idle_ttl=0.001, max_bytes=1)
+    alice = registry.storage("alice")
+    cid = make_container(alice)
+    revisions = []
+    assert registry.subscribe("alice", cid, revisions.append) is alice
+    assert registry.stats()["pinned"] == 1
+
+    registry.storage("bob")
+    registry.storage("carol")
+    assert registry.storage("alice") is alice                    # pinned: never evicted
+    make_container(alice, "elsewhere")                           # other container: not announced
+    alice.upsert_node(GraphNode(container_id=cid, title="n"))
+    assert revisions == [alice.container_revision(cid)]
+
+    registry.unsubscribe("alice", cid, revisions.append)
+    assert registry.stats()["pinned"] == 0
+    registry.storage("bob")
+    assert registry.storage("alice") is not alice
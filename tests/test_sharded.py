@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+
+from rks.models import GraphEdge, GraphNode, KnowledgeContainer
+from rks.storage import FileStorage
+
+
+@pytest.fixture
+def store(tmp_path, make_container):
+    storage = FileStorage(tmp_path, layout="sharded")
+    cids = [make_container(storage, str(i)) for i in range(5)]
+    for cid in cids:
+        a, b = GraphNode(container_id=cid, title="a"), GraphNode(container_id=cid, title="b")
+        storage.upsert_many(nodes=[a, b],
+                            edges=[GraphEdge(container_id=cid, source_node_id=a.node_id, target_node_id=b.node_id)])
+    return tmp_path, cids
+
+
+def test_point_lookups_open_only_the_owning_shard(store):
+    path, cids = store
+    storage = FileStorage(path)
+    node = storage.list_nodes(cids[3])[0]
+    fresh = FileStorage(path)
+    assert fresh.get_node("N_unknown") is None
+    assert fresh.maybe_compact(open_only=True) is None
+    fresh.snapshot()
+    assert fresh._shards == {}
+    assert fresh.get_node(node.node_id).title == node.title
+    assert fresh.edge_count(node.node_id) == 1
+    assert list(fresh._shards) == [cids[3]]
+
+
+def test_record_without_change_entry_is_found_and_routed(store, monkeypatch):
+    path, cids = store
+    storage = FileStorage(path)
+    orphan = GraphNode(container_id=cids[1], title="orphan")
+
+    def crash(changes):
+        raise OSError("killed")
+
+    monkeypatch.setattr(storage._changes, "record", crash)
+    with pytest.raises(OSError):
+        storage.upsert_node(orphan)                              # data landed, change entry did not
+
+    reopened = FileStorage(path)
+    assert reopened.get_node(orphan.node_id).title == "orphan"
+    assert reopened.container_of(orphan.node_id) == cids[1]      # entry written by the lookup
+    assert FileStorage(path).get_node(orphan.node_id).title == "orphan"
+
+
+def test_flat_store_migrates_and_routes(tmp_path):
+    flat = FileStorage(tmp_path, layout="flat")
+    c = KnowledgeContainer(title="c")
+    flat.upsert_container(c)
+    node = GraphNode(container_id=c.container_id, title="n")
+    flat.upsert_node(node)
+    (tmp_path / "changes.jsonl").unlink()                        # data older than the change log
+
+    moved = FileStorage(tmp_path, layout="flat").migrate_to_sharded()
+    assert moved["nodes"] == 1
+    sharded = FileStorage(tmp_path)
+    assert sharded.get_node(node.node_id).title == "n"
+    assert sharded.container_of(node.node_id) == c.container_id
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from rks import llm
+from rks.singleflight import SingleFlight
+
+
+def test_identical_calls_share_one_task():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.run("k", work) for _ in range(5)))
+        assert flights.stats() == {"in_flight": 0, "started": 1, "joined": 4}
+        assert await flights.run("k", work) == "done"           # finished: next call starts anew
+        assert flights.join("k") is None
+        return results
+
+    assert asyncio.run(main()) == ["done"] * 5
+    assert len(calls) == 2
+
+
+def test_failure_reaches_every_waiter():
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream")
+
+    async def main():
+        flights = SingleFlight()
+        return await asyncio.gather(*(flights.run("k", boom) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_dropped_waiter_logs_nothing(caplog):
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream")
+
+    async def main():
+        flights = SingleFlight()
+        flights.run("k", boom)                                   # caller went away without awaiting
+        with pytest.raises(ValueError):
+            await flights.run("k", boom)
+        await asyncio.sleep(0)
+
+    with caplog.at_level(logging.ERROR, logger="asyncio"):
+        asyncio.run(main())
+        gc.collect()
+    assert "never retrieved" not in caplog.text
+
+
+def test_complete_coalesces_identical_requests(monkeypatch):
+    calls = []
+
+    async def create(**params):
+        calls.append(params)
+        await asyncio.sleep(0.01)
+        message = SimpleNamespace(content="trả lời")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(llm, "_client", fake)
+    monkeypatch.setattr(llm, "_slots", None)
+    monkeypatch.setattr(llm, "_cache", None)
+    monkeypatch.setattr(llm, "_flights", SingleFlight())
+    params = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+
+    async def main():
+        return await asyncio.gather(*(llm.complete(**params) for _ in range(4)))
+
+    assert asyncio.run(main()) == ["trả lời"] * 4
+    assert len(calls) == 1
+    assert llm.inflight_stats() == {"in_flight": 0, "started": 1, "joined": 3}
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import pytest
+
+from rks.models import GraphNode
+from rks.storage import FileStorage
+
+
+@pytest.mark.parametrize("layout", ["flat", "sharded"])
+def test_snapshot_then_tail_reload(tmp_path, make_container, layout):
+    storage = FileStorage(tmp_path, layout=layout)
+    cid = make_container(storage)
+    before = [GraphNode(container_id=cid, title=f"a{i}") for i in range(50)]
+    storage.upsert_many(nodes=before)
+    assert storage.snapshot()["snapshots_written"] > 0
+
+    after = [GraphNode(container_id=cid, title=f"b{i}") for i in range(10)]
+    storage.upsert_many(nodes=after)
+    storage.upsert_node(before[0].model_copy(update={"title": "renamed"}))
+    storage.delete_node(before[1].node_id)
+
+    reopened = FileStorage(tmp_path)
+    titles = {n.title for n in reopened.list_nodes(cid)}
+    assert titles == {"renamed", *(n.title for n in before[2:]), *(n.title for n in after)}
+    assert reopened.get_node(before[1].node_id) is None
+    assert reopened.get_node(after[-1].node_id).title == "b9"
+    assert reopened.container_revision(cid) == storage.container_revision(cid)
+
+
+def test_snapshot_is_used_on_cold_start(tmp_path, make_container):
+    storage = FileStorage(tmp_path)
+    cid = make_container(storage)
+    storage.upsert_many(nodes=[GraphNode(container_id=cid, title=str(i)) for i in range(20)])
+    storage.snapshot()
+    storage.upsert_node(GraphNode(container_id=cid, title="tail"))
+
+    reopened = FileStorage(tmp_path)
+    assert len(reopened.list_nodes(cid)) == 21
+    nodes = reopened._flat["nodes"]
+    assert 0 < nodes.snapshot_lag() < nodes.path.stat().st_size   # only the tail was parsed
+
+
+def test_corrupt_or_stale_snapshot_is_ignored(tmp_path, make_container):
+    storage = FileStorage(tmp_path)
+    cid = make_container(storage)
+    storage.upsert_many(nodes=[GraphNode(container_id=cid, title=str(i)) for i in range(20)])
+    storage.snapshot()
+    snap = storage._flat["nodes"].snap_path
+
+    data = bytearray(snap.read_bytes())
+    data[-5] ^= 0xFF                                            # body no longer matches its CRC
+    snap.write_bytes(bytes(data))
+    assert len(FileStorage(tmp_path).list_nodes(cid)) == 20
+
+    assert storage._flat["nodes"].save_snapshot()              # valid again
+    path = storage._flat["nodes"].path
+    lines = path.read_bytes().splitlines(keepends=True)
+    path.write_bytes(b"".join(lines[:5]))                       # rewritten behind the snapshot's back
+    assert len(FileStorage(tmp_path).list_nodes(cid)) == 5
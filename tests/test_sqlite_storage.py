@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import pytest
+
+from rks.models import GraphEdge, GraphNode, Source
+from rks.registry import UserRegistry
+from rks.sqlite_storage import SqliteStorage
+from rks.storage import FileStorage
+
+
+def _fill(storage, make_container) -> tuple[str, list[GraphNode]]:
+    cid = make_container(storage)
+    nodes = [GraphNode(container_id=cid, title=str(i)) for i in range(4)]
+    edges = [GraphEdge(container_id=cid, source_node_id=nodes[0].node_id, target_node_id=n.node_id)
+             for n in nodes[1:]]
+    storage.upsert_many(nodes=nodes, edges=edges,
+                        sources=[Source(container_id=cid, label="s")])
+    return cid, nodes
+
+
+def test_crud_and_change_feed(tmp_path, make_container):
+    storage = SqliteStorage(tmp_path / "store.sqlite3")
+    cid, nodes = _fill(storage, make_container)
+    assert [n.title for n in storage.list_nodes(cid)] == ["0", "1", "2", "3"]
+    assert storage.edge_count(nodes[0].node_id) == 3
+    assert len(storage.list_edges_for_node(nodes[1].node_id, "in")) == 1
+    assert storage.container_of(nodes[2].node_id) == cid
+
+    revision = storage.container_revision(cid)
+    storage.upsert_node(nodes[1].model_copy(update={"title": "renamed"}))
+    storage.delete_node(nodes[2].node_id)
+    changes = storage.changes_since(cid, revision)
+    assert [r["title"] for r in changes["nodes"]] == ["renamed"]
+    assert changes["deleted_node_ids"] == [nodes[2].node_id]
+    assert len(changes["deleted_edge_ids"]) == 1
+    assert storage.container_of(nodes[2].node_id) is None
+
+    storage.delete_container(cid)
+    assert storage.list_containers() == [] and storage.get_node(nodes[0].node_id) is None
+
+
+def test_create_from_imports_everything(tmp_path, make_container):
+    source = FileStorage(tmp_path / "jsonl")
+    cid, nodes = _fill(source, make_container)
+    db = tmp_path / "store.sqlite3"
+
+    counts = SqliteStorage.create_from(db, source)
+    assert counts == {"containers": 1, "sources": 1, "nodes": 4, "edges": 3}
+    assert SqliteStorage.create_from(db, source) is None          # never overwrites
+    imported = SqliteStorage(db)
+    assert {n.node_id for n in imported.list_nodes(cid)} == {n.node_id for n in nodes}
+    assert imported.store_revision() > 0
+
+
+def test_failed_import_leaves_no_database(tmp_path, make_container, monkeypatch):
+    source = FileStorage(tmp_path / "jsonl")
+    _fill(source, make_container)
+
+    def fail(self, container_id):
+        raise OSError("disk gone")
+
+    monkeypatch.setattr(FileStorage, "list_edges", fail)
+    db = tmp_path / "store.sqlite3"
+    with pytest.raises(OSError):
+        SqliteStorage.create_from(db, source)
+    assert not db.exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["jsonl", "store.sqlite3.lock"]
+
+
+def test_registry_imports_jsonl_on_first_open(tmp_path, make_container):
+    user_dir = tmp_path / "users" / "alice"
+    cid, _ = _fill(FileStorage(user_dir), make_container)
+    storage = UserRegistry(tmp_path, backend="sqlite").storage("alice")
+    assert isinstance(storage, SqliteStorage)
+    assert len(storage.list_nodes(cid)) == 4
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from rks.models import GraphNode
+from rks.storage import FileStorage
+
+
+def test_deletes_survive_reload_and_fold(tmp_path, make_container, monkeypatch):
+    monkeypatch.setattr(FileStorage, "_TOMBSTONE_FOLD_EVERY", 5)
+    storage = FileStorage(tmp_path)
+    cid = make_container(storage)
+    nodes = [GraphNode(container_id=cid, title=str(i)) for i in range(12)]
+    storage.upsert_many(nodes=nodes)
+    for n in nodes[:8]:
+        storage.delete_node(n.node_id)
+
+    assert (tmp_path / "deleted_ids.json").exists()             # folded at least once
+    log_lines = (tmp_path / "deleted_ids.log").read_text().splitlines()
+    assert len(log_lines) < 5
+    reopened = FileStorage(tmp_path)
+    assert {n.title for n in reopened.list_nodes(cid)} == {str(i) for i in range(8, 12)}
+
+
+def test_torn_tombstone_tail_does_not_resurrect(tmp_path, make_container):
+    storage = FileStorage(tmp_path)
+    cid = make_container(storage)
+    keep, drop = (GraphNode(container_id=cid, title=t) for t in ("keep", "drop"))
+    storage.upsert_many(nodes=[keep, drop])
+    with (tmp_path / "deleted_ids.log").open("ab") as f:
+        f.write(b"half-an-id")                                   # crash mid-append
+    FileStorage(tmp_path).delete_node(drop.node_id)
+
+    reopened = FileStorage(tmp_path)
+    assert reopened.get_node(drop.node_id) is None
+    assert [n.title for n in reopened.list_nodes(cid)] == ["keep"]
+
+
+def test_other_instance_sees_new_tombstones(tmp_path, make_container):
+    a = FileStorage(tmp_path)
+    cid = make_container(a)
+    node = GraphNode(container_id=cid, title="n")
+    a.upsert_node(node)
+    b = FileStorage(tmp_path)
+    assert b.get_node(node.node_id) is not None
+    a.delete_node(node.node_id)
+    assert b.get_node(node.node_id) is None
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import hashlib
+import logging
 import os
 import secrets
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
 from fastapi import Depends, FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
@@ -16,7 +21,10 @@ from starlette.responses import Response
 
 load_dotenv()
 
+from rks import codec, llm
 from rks.agent import CognitiveAgent
+from rks.async_storage import AsyncAbstractStorage, ExecutorStorage
+from rks.llm_cache import ResponseCache
 from rks.models import (
     ContainerCreate,
     EdgeCreate,
@@ -33,7 +41,55 @@ from rks.models import (
     SourceCreate,
     SourceType,
 )
-from rks.storage import FileStorage
+from rks.registry import UserRegistry
+from rks.storage import AbstractStorage, FileStorage
+
+log = logging.getLogger(__name__)
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded by rks.codec (orjson/msgspec when installed).
+    Route handlers return it directly so FastAPI's jsonable_encoder pass is
+    skipped for large payloads."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return codec.dumps(content)
+
+
+# ── Conditional GET ────────────────────────────────────────────────
+# ETag mạnh = user + phạm vi + revision của storage (chỉ tăng); nếu khớp
+# If-None-Match thì trả 304 luôn, không đọc/serialize data. "no-cache" bắt
+# browser hỏi lại mỗi lần nhưng dùng lại body đã cache khi nhận 304.
+_CACHE_CONTROL = "private, no-cache"
+
+
+def _etag(user: str, *parts) -> str:
+    who = hashlib.blake2s(user.encode("utf-8"), digest_size=6).hexdigest()
+    return '"' + "-".join([who, *map(str, parts)]) + '"'
+
+
+def _not_modified(request: Request, etag: str) -> Response | None:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _CACHE_CONTROL})
+    return None
+
+
+def _validated(content, etag: str) -> FastJSONResponse:
+    return FastJSONResponse(content, headers={"ETag": etag, "Cache-Control": _CACHE_CONTROL})
+
+
+# ── Server-Sent Events ─────────────────────────────────────────────
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse(event: str, data, event_id=None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {codec.dumps(data).decode('utf-8')}\n\n"
 
 
 class _ContainerUpdate(BaseModel):
@@ -42,7 +98,55 @@ class _ContainerUpdate(BaseModel):
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Cognitive Graph Agent v1.0")
+    # ── Background compaction + snapshot ───────────────────────────────
+    # Định kỳ gọi maybe_compact() rồi snapshot() trên các storage đang "ấm"
+    # trong registry (chỉ các shard đã mở, không nạp thêm mindmap); khi tắt
+    # app (redeploy) ghi snapshot lần cuối để lần khởi động sau chỉ phải đọc
+    # snapshot + phần đuôi JSONL.
+    # COMPACT_INTERVAL_SECONDS=0 → tắt vòng lặp.
+    compact_interval = float(os.environ.get("COMPACT_INTERVAL_SECONDS", "600"))
+    compact_ratio    = float(os.environ.get("COMPACT_DEAD_RATIO", "0.5"))
+    compact_min      = int(os.environ.get("COMPACT_MIN_RECORDS", "1000"))
+    snapshot_min     = int(os.environ.get("SNAPSHOT_MIN_BYTES", "262144"))
+    # SSE: ngoài thông báo trong process, cứ mỗi SSE_POLL_SECONDS kiểm tra
+    # revision (bắt được ghi từ worker khác) + gửi keepalive.
+    sse_poll         = float(os.environ.get("SSE_POLL_SECONDS", "15"))
+
+    # ── Executor cho route async ───────────────────────────────────────
+    # Route async (graph, explore, auto-document) chạy I/O storage trên pool
+    # riêng thay vì threadpool mặc định của Starlette (40 thread); lời gọi
+    # LLM thì await trên AsyncOpenAI dùng chung (rks.llm), không giữ thread.
+    storage_io = ThreadPoolExecutor(max_workers=int(os.environ.get("STORAGE_IO_THREADS", "16")),
+                                    thread_name_prefix="storage-io")
+
+    def _file_storages(app: FastAPI) -> list[FileStorage]:
+        return [s for s in app.state.registry.storages() if isinstance(s, FileStorage)]
+
+    async def _compaction_loop(app: FastAPI) -> None:
+        while True:
+            await asyncio.sleep(compact_interval)
+            for storage in _file_storages(app):
+                try:
+                    await asyncio.to_thread(storage.maybe_compact, compact_ratio, compact_min, True)
+                    await asyncio.to_thread(storage.snapshot, snapshot_min)
+                except Exception:
+                    log.exception("Background compaction failed for %s", storage.data_dir)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        task = asyncio.create_task(_compaction_loop(app)) if compact_interval > 0 else None
+        yield
+        if task:
+            task.cancel()
+        for storage in _file_storages(app):
+            try:
+                await asyncio.to_thread(storage.snapshot)
+            except Exception:
+                log.exception("Shutdown snapshot failed for %s", storage.data_dir)
+        await llm.aclose()
+        storage_io.shutdown(wait=True)
+
+    app = FastAPI(title="Cognitive Graph Agent v1.0", lifespan=lifespan)
 
     # ── HTTP Basic Auth ────────────────────────────────────────────────
     # Chỉ bật khi APP_PASSWORD được set trong .env / environment.
@@ -73,23 +177,55 @@ def create_app() -> FastAPI:
     base_dir  = Path(__file__).resolve().parent
     data_base = base_dir.parent / "data"
 
+    # ── LLM response cache (data/llm_cache.sqlite3) ────────────────────
+    # Dùng chung cho mọi user; LLM_CACHE_TTL_SECONDS=0 → tắt.
+    llm_cache_ttl = float(os.environ.get("LLM_CACHE_TTL_SECONDS", "604800"))
+    if llm_cache_ttl > 0:
+        llm.set_cache(ResponseCache(
+            data_base / "llm_cache.sqlite3",
+            ttl=llm_cache_ttl,
+            max_bytes=int(float(os.environ.get("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024),
+        ))
+
     templates = Jinja2Templates(directory=str(base_dir / "templates"))
     app.mount("/static", StaticFiles(directory=str(base_dir / "static")), name="static")
 
     # ── Per-user dependency chain ──────────────────────────────────────────
-    # get_current_user → get_storage → get_agent
+    # get_current_user → get_storage / get_agent
     # Mỗi request tự động nhận đúng storage của user đang đăng nhập.
+    # Storage + agent được giữ trong registry (LRU, tự bỏ khi idle) để
+    # index đã nạp được tái sử dụng giữa các request; LLM client thì dùng
+    # chung cho cả process (rks.llm).
+
+    registry = UserRegistry(
+        data_base,
+        max_users=int(os.environ.get("STORAGE_CACHE_MAX_USERS", "32")),
+        idle_ttl=float(os.environ.get("STORAGE_CACHE_IDLE_SECONDS", "1800")),
+        max_bytes=int(float(os.environ.get("STORAGE_CACHE_MAX_MB", "0")) * 1024 * 1024),
+        io_executor=storage_io,
+        backend=os.environ.get("STORAGE_BACKEND", "file").strip() or "file",
+        layout=os.environ.get("STORAGE_LAYOUT", "").strip() or None,
+        durability=os.environ.get("STORAGE_DURABILITY", "none").strip() or "none",
+        fsync_interval_ms=float(os.environ.get("STORAGE_FSYNC_INTERVAL_MS", "50")),
+        fsync_batch_records=int(os.environ.get("STORAGE_FSYNC_BATCH_RECORDS", "100")),
+        index_mode=os.environ.get("STORAGE_INDEX_MODE", "resident").strip() or "resident",
+    )
+    app.state.registry = registry
 
     def get_current_user(request: Request) -> str:
         """Trả về username từ Basic Auth header hoặc 'default' (local mode)."""
         return getattr(request.state, "username", "default")
 
-    def get_storage(user: str = Depends(get_current_user)) -> FileStorage:
-        """Tạo FileStorage trỏ vào data/users/{username}/ — mỗi user cách ly hoàn toàn."""
-        return FileStorage(data_dir=data_base / "users" / user)
+    def get_storage(user: str = Depends(get_current_user)) -> AbstractStorage:
+        """FileStorage trỏ vào data/users/{username}/ — mỗi user cách ly hoàn toàn."""
+        return registry.storage(user)
 
-    def get_agent(storage: FileStorage = Depends(get_storage)) -> CognitiveAgent:
-        return CognitiveAgent(storage=storage)
+    def get_async_storage(storage: AbstractStorage = Depends(get_storage)) -> AsyncAbstractStorage:
+        """Storage của user, bọc để route async await trên pool storage-io."""
+        return ExecutorStorage(storage, storage_io)
+
+    def get_agent(user: str = Depends(get_current_user)) -> CognitiveAgent:
+        return registry.agent(user)
 
     # ────────────────────────────────────────────────────────────
     # MAIN PAGE
@@ -109,20 +245,23 @@ def create_app() -> FastAPI:
     # KNOWLEDGE CONTAINERS
     # ────────────────────────────────────────────────────────────
 
-    @app.get("/api/containers")
-    def list_containers(storage: FileStorage = Depends(get_storage)):
-        return storage.list_containers()
+    @app.get("/api/containers", response_class=FastJSONResponse)
+    def list_containers(request: Request,
+                        storage: AbstractStorage = Depends(get_storage),
+                        user: str = Depends(get_current_user)):
+        etag = _etag(user, "containers", storage.store_revision())
+        return _not_modified(request, etag) or _validated(storage.list_containers(), etag)
 
     @app.post("/api/containers", status_code=201)
     def create_container(body: ContainerCreate,
-                         storage: FileStorage = Depends(get_storage),
+                         storage: AbstractStorage = Depends(get_storage),
                          user: str = Depends(get_current_user)):
         c = KnowledgeContainer(user_id=user, title=body.title.strip(), description=body.description.strip())
         storage.upsert_container(c)
         return c
 
     @app.delete("/api/containers/{container_id}")
-    def delete_container(container_id: str, storage: FileStorage = Depends(get_storage)):
+    def delete_container(container_id: str, storage: AbstractStorage = Depends(get_storage)):
         c = storage.get_container(container_id)
         if not c:
             raise HTTPException(404, "Container not found")
@@ -131,7 +270,7 @@ def create_app() -> FastAPI:
 
     @app.patch("/api/containers/{container_id}")
     def update_container(container_id: str, body: _ContainerUpdate,
-                         storage: FileStorage = Depends(get_storage)):
+                         storage: AbstractStorage = Depends(get_storage)):
         c = storage.get_container(container_id)
         if not c:
             raise HTTPException(404, "Container not found")
@@ -145,13 +284,16 @@ def create_app() -> FastAPI:
     # SOURCES
     # ────────────────────────────────────────────────────────────
 
-    @app.get("/api/containers/{container_id}/sources")
-    def list_sources(container_id: str, storage: FileStorage = Depends(get_storage)):
-        return storage.list_sources(container_id)
+    @app.get("/api/containers/{container_id}/sources", response_class=FastJSONResponse)
+    def list_sources(container_id: str, request: Request,
+                     storage: AbstractStorage = Depends(get_storage),
+                     user: str = Depends(get_current_user)):
+        etag = _etag(user, "sources", container_id, storage.container_revision(container_id, ("source",)))
+        return _not_modified(request, etag) or _validated(storage.list_sources(container_id), etag)
 
     @app.post("/api/containers/{container_id}/sources", status_code=201)
     def create_source(container_id: str, body: SourceCreate,
-                      storage: FileStorage = Depends(get_storage)):
+                      storage: AbstractStorage = Depends(get_storage)):
         if not storage.get_container(container_id):
             raise HTTPException(404, "Container not found")
         s = Source(
@@ -165,7 +307,7 @@ def create_app() -> FastAPI:
         return s
 
     @app.delete("/api/sources/{source_id}")
-    def delete_source(source_id: str, storage: FileStorage = Depends(get_storage)):
+    def delete_source(source_id: str, storage: AbstractStorage = Depends(get_storage)):
         storage.delete_source(source_id)
         return {"ok": True}
 
@@ -173,18 +315,92 @@ def create_app() -> FastAPI:
     # GRAPH NODES
     # ────────────────────────────────────────────────────────────
 
-    @app.get("/api/containers/{container_id}/graph")
-    def get_graph(container_id: str, storage: FileStorage = Depends(get_storage)):
+    @app.get("/api/containers/{container_id}/graph", response_class=FastJSONResponse)
+    async def get_graph(container_id: str, request: Request,
+                        storage: AsyncAbstractStorage = Depends(get_async_storage),
+                        user: str = Depends(get_current_user)):
         """Trả về toàn bộ nodes + edges của container (cho Mindmap)."""
-        if not storage.get_container(container_id):
+        if not await storage.get_container(container_id):
             raise HTTPException(404, "Container not found")
-        nodes = storage.list_nodes(container_id)
-        edges = storage.list_edges(container_id)
-        return {"nodes": nodes, "edges": edges}
+        revision = await storage.container_revision(container_id)   # đọc trước data
+        etag = _etag(user, "graph", container_id, revision)
+        if (resp := _not_modified(request, etag)) is not None:
+            return resp
+        nodes = await storage.list_node_rows(container_id)
+        edges = await storage.list_edge_rows(container_id)
+        return _validated({"nodes": nodes, "edges": edges, "revision": revision}, etag)
+
+    @app.get("/api/containers/{container_id}/graph/changes", response_class=FastJSONResponse)
+    async def get_graph_changes(container_id: str, since: int = 0,
+                                storage: AsyncAbstractStorage = Depends(get_async_storage)):
+        """Delta sync: nodes/edges thêm-sửa-xoá sau revision `since`.
+        `reset: true` → lịch sử đã bị compact, client phải tải lại /graph."""
+        if not await storage.get_container(container_id):
+            raise HTTPException(404, "Container not found")
+        changes = await storage.changes_since(container_id, since)
+        if changes is None:
+            return FastJSONResponse({"reset": True, "revision": await storage.container_revision(container_id)})
+        return FastJSONResponse({"reset": False, **changes})
+
+    @app.get("/api/containers/{container_id}/graph/events")
+    async def graph_events(container_id: str, request: Request, since: int | None = None,
+                           user: str = Depends(get_current_user),
+                           storage: AsyncAbstractStorage = Depends(get_async_storage)):
+        """SSE: đẩy node/edge thêm-sửa-xoá của container ngay khi storage ghi.
+        Mỗi event `changes` mang payload giống /graph/changes và `id` =
+        revision, nên EventSource tự nối lại từ Last-Event-ID.  Đăng ký qua
+        registry: storage của user được pin suốt kết nối, không bị evict."""
+        if not await storage.get_container(container_id):
+            raise HTTPException(404, "Container not found")
+        last_id = request.headers.get("last-event-id", "")
+        if last_id.isdigit():
+            since = int(last_id)
+        if since is None:
+            since = await storage.container_revision(container_id)
+
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def on_change(revision: int) -> None:
+            loop.call_soon_threadsafe(wake.set)
+
+        def release(subscribed: asyncio.Future) -> None:
+            if not subscribed.cancelled() and subscribed.exception() is None:
+                registry.unsubscribe(user, container_id, on_change)
+
+        async def stream():
+            last = since
+            subscribed = loop.run_in_executor(storage_io, registry.subscribe, user, container_id, on_change)
+            try:
+                pinned = ExecutorStorage(await asyncio.shield(subscribed), storage_io)
+            except asyncio.CancelledError:
+                subscribed.add_done_callback(release)   # huỷ giữa chừng vẫn gỡ pin
+                raise
+            try:
+                yield "retry: 3000\n\n"
+                while not await request.is_disconnected():
+                    wake.clear()
+                    revision = await pinned.container_revision(container_id)
+                    if revision > last:
+                        changes = await pinned.changes_since(container_id, last)
+                        if changes is None:
+                            changes = {"reset": True, "revision": revision}
+                        else:
+                            changes = {"reset": False, **changes}
+                        last = changes["revision"]
+                        yield _sse("changes", changes, last)
+                    try:
+                        await asyncio.wait_for(wake.wait(), timeout=sse_poll)
+                    except asyncio.TimeoutError:
+                        yield ": keepalive\n\n"
+            finally:
+                release(subscribed)
+
+        return StreamingResponse(stream(), media_type="text/event-stream", headers=_SSE_HEADERS)
 
     @app.post("/api/containers/{container_id}/nodes", status_code=201)
     def create_node(container_id: str, body: NodeCreate,
-                    storage: FileStorage = Depends(get_storage)):
+                    storage: AbstractStorage = Depends(get_storage)):
         if not storage.get_container(container_id):
             raise HTTPException(404, "Container not found")
         node = GraphNode(
@@ -197,52 +413,61 @@ def create_app() -> FastAPI:
         return node
 
     @app.get("/api/nodes/{node_id}")
-    def get_node(node_id: str,
-                 storage: FileStorage = Depends(get_storage),
-                 agent: CognitiveAgent = Depends(get_agent)):
+    def get_node(node_id: str, request: Request,
+                 storage: AbstractStorage = Depends(get_storage),
+                 agent: CognitiveAgent = Depends(get_agent),
+                 user: str = Depends(get_current_user)):
+        # edge_count phụ thuộc cả edges → dùng revision graph của container.
+        # Đọc revision trước node (như /graph) và trả 304 trước khi đọc data;
+        # container lấy từ change feed, node cũ chưa có entry thì đọc node.
+        container_id = storage.container_of(node_id)
+        if container_id is None:
+            container_id = getattr(storage.get_node(node_id), "container_id", None)
+        if container_id is None:
+            raise HTTPException(404, "Node not found")
+        etag = _etag(user, "node", node_id, storage.container_revision(container_id))
+        if (resp := _not_modified(request, etag)) is not None:
+            return resp
         node = storage.get_node(node_id)
         if not node:
             raise HTTPException(404, "Node not found")
         ok, missing = agent.can_activate(node)
-        edges = storage.list_edges(node.container_id)
-        connected_edges = [e for e in edges if e.source_node_id == node_id or e.target_node_id == node_id]
-        return {
+        return _validated({
             "node": node,
             "can_activate": ok,
             "missing_fields": missing,
-            "edge_count": len(connected_edges),
-        }
+            "edge_count": storage.edge_count(node_id),
+        }, etag)
 
     @app.patch("/api/nodes/{node_id}/document")
     def update_node_document(node_id: str, body: NodeDocument,
-                             storage: FileStorage = Depends(get_storage),
+                             storage: AbstractStorage = Depends(get_storage),
                              agent: CognitiveAgent = Depends(get_agent)):
         try:
             node = agent.update_node_document(node_id, body)
         except KeyError:
             raise HTTPException(404, "Node not found")
         ok, missing = agent.can_activate(node)
-        edges = storage.list_edges(node.container_id)
-        edge_count = sum(1 for e in edges if e.source_node_id == node_id or e.target_node_id == node_id)
         return {
             "node": node,
             "can_activate": ok,
             "missing_fields": missing,
-            "edge_count": edge_count,
+            "edge_count": storage.edge_count(node_id),
         }
 
     @app.delete("/api/nodes/{node_id}")
     def delete_node(node_id: str, cascade: bool = True,
-                    storage: FileStorage = Depends(get_storage)):
+                    storage: AbstractStorage = Depends(get_storage)):
         node = storage.get_node(node_id)
         if not node:
             raise HTTPException(404, "Node not found")
         if cascade:
-            deleted_ids = storage.delete_node_cascade(node_id)
-            return {"ok": True, "deleted_ids": deleted_ids}
+            deleted_ids, deleted_edge_ids = storage.delete_node_cascade(node_id)
+            return {"ok": True, "deleted_ids": deleted_ids, "deleted_edge_ids": deleted_edge_ids}
         else:
+            deleted_edge_ids = [e.edge_id for e in storage.list_edges_for_node(node_id)]
             storage.delete_node(node_id)
-            return {"ok": True, "deleted_ids": [node_id]}
+            return {"ok": True, "deleted_ids": [node_id], "deleted_edge_ids": deleted_edge_ids}
 
     # ────────────────────────────────────────────────────────────
     # EDGES
@@ -250,7 +475,7 @@ def create_app() -> FastAPI:
 
     @app.post("/api/edges", status_code=201)
     def create_edge(body: EdgeCreate,
-                    storage: FileStorage = Depends(get_storage),
+                    storage: AbstractStorage = Depends(get_storage),
                     agent: CognitiveAgent = Depends(get_agent)):
         src = storage.get_node(body.source_node_id)
         tgt = storage.get_node(body.target_node_id)
@@ -261,7 +486,7 @@ def create_app() -> FastAPI:
 
     @app.patch("/api/edges/{edge_id}")
     def update_edge(edge_id: str, body: dict,
-                    storage: FileStorage = Depends(get_storage)):
+                    storage: AbstractStorage = Depends(get_storage)):
         edge = storage.get_edge(edge_id)
         if not edge:
             raise HTTPException(404, "Edge not found")
@@ -274,7 +499,7 @@ def create_app() -> FastAPI:
         return edge
 
     @app.delete("/api/edges/{edge_id}")
-    def delete_edge(edge_id: str, storage: FileStorage = Depends(get_storage)):
+    def delete_edge(edge_id: str, storage: AbstractStorage = Depends(get_storage)):
         storage.delete_edge(edge_id)
         return {"ok": True}
 
@@ -283,43 +508,74 @@ def create_app() -> FastAPI:
     # ────────────────────────────────────────────────────────────
 
     @app.post("/api/explore")
-    def explore(body: ExploreRequest,
-                agent: CognitiveAgent = Depends(get_agent)):
-        return agent.explore(body)
+    async def explore(body: ExploreRequest, stream: bool = False, cache: bool = True,
+                      agent: CognitiveAgent = Depends(get_agent)):
+        """`?stream=1` → SSE: "token" cho từng đoạn text, "summary"/"block"
+        (clarify) ngay khi parse xong, event cuối "done" = ExploreResponse.
+        `?cache=0` → bỏ qua cache câu trả lời LLM, luôn gọi API."""
+        if not stream:
+            return await agent.explore(body, use_cache=cache)
+
+        async def events():
+            async for event, data in agent.explore_stream(body, use_cache=cache):
+                yield _sse(event, data)
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=_SSE_HEADERS)
 
     @app.post("/api/nodes/{node_id}/auto-document")
-    def auto_document(node_id: str,
-                      storage: FileStorage = Depends(get_storage),
-                      agent: CognitiveAgent = Depends(get_agent)):
-        """AI tự động điền definition/mechanism/boundary/assumptions."""
+    async def auto_document(node_id: str, cache: bool = True,
+                            storage: AsyncAbstractStorage = Depends(get_async_storage),
+                            agent: CognitiveAgent = Depends(get_agent)):
+        """AI tự động điền definition/mechanism/boundary/assumptions.
+        `?cache=0` → bỏ qua cache câu trả lời LLM."""
         try:
-            result = agent.auto_document_node(node_id)
+            result = await agent.auto_document_node(node_id, use_cache=cache)
         except KeyError:
             raise HTTPException(404, "Node not found")
         node = result["node"]
         ok, missing = agent.can_activate(node)
-        edges = storage.list_edges(node.container_id)
-        edge_count = sum(1 for e in edges if e.source_node_id == node_id or e.target_node_id == node_id)
         return {
             "node": node,
             "can_activate": ok,
             "missing_fields": missing,
-            "edge_count": edge_count,
+            "edge_count": await storage.edge_count(node_id),
             "suggested_nodes": result["suggested_nodes"],
         }
 
     # ────────────────────────────────────────────────────────────
-    # CONFIRM SUGGESTED NODE (từ Explore Expand mode)
+    # ADMIN — storage maintenance
     # ────────────────────────────────────────────────────────────
 
-    @app.post("/api/nodes/{node_id}/confirm-suggested", status_code=201)
-    def confirm_suggested(node_id: str, body: dict,
-                          storage: FileStorage = Depends(get_storage)):
-        """Tạo node mới từ AI suggestion và tạo edge nối về node gốc."""
-        parent = storage.get_node(node_id)
-        if not parent:
-            raise HTTPException(404, "Parent node not found")
+    @app.post("/api/admin/compact")
+    def compact_storage(force: bool = True, storage: AbstractStorage = Depends(get_storage)):
+        """Gộp JSONL của user hiện tại: chỉ giữ bản mới nhất còn sống của mỗi ID."""
+        if not isinstance(storage, FileStorage):
+            raise HTTPException(400, "Compaction only applies to the JSONL file backend")
+        if force:
+            return {"compacted": True, **storage.compact()}
+        result = storage.maybe_compact(compact_ratio, compact_min)
+        if result is None:
+            return {"compacted": False, **storage.compaction_stats()}
+        return {"compacted": True, **result}
+
+    @app.get("/api/admin/stats")
+    def storage_stats(storage: AbstractStorage = Depends(get_storage)):
+        """Chỉ số storage của user hiện tại (fsync latency, RAM ước tính)
+        + bộ đếm cache storage, cache LLM và single-flight LLM của cả process."""
+        stats: dict = {"backend": type(storage).__name__,
+                       "memory_estimate": storage.memory_estimate()}
+        if isinstance(storage, FileStorage):
+            stats["durability"] = storage.durability_stats()
+        stats["cache"] = registry.stats()
+        stats["llm_cache"] = llm.cache_stats()
+        stats["llm_inflight"] = llm.inflight_stats()
+        return stats
+
+    # ────────────────────────────────────────────────────────────
+    # CONFIRM SUGGESTED NODE (từ Explore Expand mode)
+    # ────────────────────────────────────────────────────────────
 
+    def _suggested_to_graph(parent: GraphNode, body: dict) -> tuple[GraphNode, GraphEdge]:
         new_node = GraphNode(
             container_id=parent.container_id,
             title=body.get("title", "").strip(),
@@ -328,18 +584,43 @@ def create_app() -> FastAPI:
             definition=body.get("definition", ""),
             source_type="LLM_GENERATED",
         )
-        storage.upsert_node(new_node)
-
         edge = GraphEdge(
             container_id=parent.container_id,
             source_node_id=new_node.node_id,
-            target_node_id=node_id,
+            target_node_id=parent.node_id,
             relation_type=RelationType(body.get("relation_type", RelationType.PART_OF)),
         )
-        storage.upsert_edge(edge)
+        return new_node, edge
+
+    @app.post("/api/nodes/{node_id}/confirm-suggested", status_code=201)
+    def confirm_suggested(node_id: str, body: dict,
+                          storage: AbstractStorage = Depends(get_storage)):
+        """Tạo node mới từ AI suggestion và tạo edge nối về node gốc."""
+        parent = storage.get_node(node_id)
+        if not parent:
+            raise HTTPException(404, "Parent node not found")
 
+        new_node, edge = _suggested_to_graph(parent, body)
+        storage.upsert_many(nodes=[new_node], edges=[edge])
         return {"node": new_node, "edge": edge}
 
+    @app.post("/api/nodes/{node_id}/confirm-suggested/batch", status_code=201)
+    def confirm_suggested_batch(node_id: str, body: list[dict],
+                                storage: AbstractStorage = Depends(get_storage)):
+        """Như confirm-suggested nhưng cho nhiều suggestion — ghi một lần."""
+        parent = storage.get_node(node_id)
+        if not parent:
+            raise HTTPException(404, "Parent node not found")
+
+        try:
+            pairs = [_suggested_to_graph(parent, item) for item in body]
+        except ValueError as e:
+            raise HTTPException(422, str(e))
+        nodes = [n for n, _ in pairs]
+        edges = [e for _, e in pairs]
+        storage.upsert_many(nodes=nodes, edges=edges)
+        return {"nodes": nodes, "edges": edges}
+
     return app
 
 
@@ -23,6 +23,8 @@ const STATE = {
   activeSourceId:    null,   // Source đang chọn
   selectedNodeId:    null,   // Node trong Mindmap đang chọn
   graphData:         { nodes: [], edges: [] },
+  graphSync:         null,   // { containerId, revision, nodes: Map, edges: Map } cho delta sync
+  graphEvents:       null,   // EventSource nhận thay đổi graph từ tab/người khác
   chatHistory:       [],
   chatHistories:     new Map(), // key: "node:{id}" or "container:{id}" → {messages, html}
   pendingSuggested:  [],     // nodes AI đề xuất đang chờ confirm
@@ -79,6 +81,30 @@ const api = {
     if (!r.ok) throw new Error(r.statusText);
     return r.json();
   },
+  // POST rồi đọc body dạng SSE (EventSource không POST được): gọi
+  // onEvent(event, data) cho từng frame ngay khi nhận đủ.
+  async stream(url, body, onEvent) {
+    const r = await fetch(url, { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(body) });
+    if (!r.ok) { const e = await r.json().catch(()=>({detail: r.statusText})); throw new Error(e.detail || r.statusText); }
+    const reader = r.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buf = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buf += value;
+      let end;
+      while ((end = buf.indexOf('\n\n')) >= 0) {
+        const frame = buf.slice(0, end);
+        buf = buf.slice(end + 2);
+        let event = 'message', data = '';
+        for (const line of frame.split('\n')) {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        }
+        if (data) onEvent(event, JSON.parse(data));
+      }
+    }
+  },
 };
 
 // ── Toast ─────────────────────────────────────────────────────────
@@ -163,6 +189,7 @@ async function selectKnowledge(containerId) {
   });
   // Load sources + graph in parallel
   await Promise.all([loadSources(containerId), loadGraph(containerId)]);
+  subscribeGraph(containerId);
   clearDocumentPanel();
   // Wipe chat entirely on container switch (different topic scope)
   STATE.chatHistory = [];
@@ -196,6 +223,7 @@ document.getElementById('btn-remove-knowledge').addEventListener('click', async
     STATE.activeContainerId = null;
     STATE.activeSourceId    = null;
     STATE.selectedNodeId    = null;
+    subscribeGraph(null);
     await loadKnowledge();
     renderSourceList([]);
     renderGraph({ nodes: [], edges: [] });
@@ -277,23 +305,86 @@ document.getElementById('btn-remove-source').addEventListener('click', async ()
 
 let simulation = null;
 
+// Delta sync: nếu đã có graph của container này thì chỉ lấy thay đổi sau
+// revision đã biết; server trả reset → tải lại toàn bộ.
+async function fetchGraph(containerId) {
+  const sync = STATE.graphSync;
+  if (sync && sync.containerId === containerId && sync.revision != null) {
+    const ch = await api.get(`/api/containers/${containerId}/graph/changes?since=${sync.revision}`);
+    if (!ch.reset) {
+      applyGraphChanges(sync, ch);
+      return graphFromSync(sync);
+    }
+  }
+  const full = await api.get(`/api/containers/${containerId}/graph`);
+  STATE.graphSync = {
+    containerId,
+    revision: full.revision,
+    nodes: new Map(full.nodes.map(n => [n.node_id, n])),
+    edges: new Map((full.edges || []).map(e => [e.edge_id, e])),
+  };
+  return graphFromSync(STATE.graphSync);
+}
+
+function applyGraphChanges(sync, ch) {
+  ch.nodes.forEach(n => sync.nodes.set(n.node_id, n));
+  ch.edges.forEach(e => sync.edges.set(e.edge_id, e));
+  ch.deleted_node_ids.forEach(id => sync.nodes.delete(id));
+  ch.deleted_edge_ids.forEach(id => sync.edges.delete(id));
+  sync.revision = Math.max(sync.revision, ch.revision);
+}
+
+// Bản sao nông: renderGraph/D3 gắn x, y, vx, fx... vào object node
+function graphFromSync(sync) {
+  return {
+    nodes: [...sync.nodes.values()].map(n => ({ ...n })),
+    edges: [...sync.edges.values()].map(e => ({ ...e })),
+  };
+}
+
 async function loadGraph(containerId) {
   try {
-    const data = await api.get(`/api/containers/${containerId}/graph`);
-    // Filter out dangling edges (source or target no longer exists)
-    const nodeIds = new Set(data.nodes.map(n => n.node_id));
-    data.edges = (data.edges || []).filter(
-      e => nodeIds.has(e.source_node_id) && nodeIds.has(e.target_node_id)
-    );
-    STATE.graphData = data;
-    renderGraph(data);
-    document.getElementById('graph-empty').style.display = data.nodes.length ? 'none' : 'flex';
+    showGraph(await fetchGraph(containerId));
   } catch(e) {
     console.error('loadGraph error:', e);
     // Do NOT overwrite STATE.graphData on error
   }
 }
 
+function showGraph(data) {
+  // Filter out dangling edges (source or target no longer exists)
+  const nodeIds = new Set(data.nodes.map(n => n.node_id));
+  data.edges = (data.edges || []).filter(
+    e => nodeIds.has(e.source_node_id) && nodeIds.has(e.target_node_id)
+  );
+  STATE.graphData = data;
+  renderGraph(data);
+  document.getElementById('graph-empty').style.display = data.nodes.length ? 'none' : 'flex';
+}
+
+// SSE: server đẩy thay đổi của container đang mở (từ tab/người khác).
+// Event cũ hơn revision đang có thì bỏ qua; reset → tải lại toàn bộ.
+function subscribeGraph(containerId) {
+  if (STATE.graphEvents) STATE.graphEvents.close();
+  STATE.graphEvents = null;
+  const sync = STATE.graphSync;
+  if (!containerId || !window.EventSource || !sync || sync.containerId !== containerId) return;
+  const es = new EventSource(`/api/containers/${containerId}/graph/events?since=${sync.revision}`);
+  es.addEventListener('changes', ev => {
+    const cur = STATE.graphSync;
+    if (STATE.activeContainerId !== containerId || !cur || cur.containerId !== containerId) return;
+    const ch = JSON.parse(ev.data);
+    if (ch.reset) {
+      STATE.graphSync = null;
+      loadGraph(containerId);
+    } else if (ch.revision > cur.revision) {
+      applyGraphChanges(cur, ch);
+      showGraph(graphFromSync(cur));
+    }
+  });
+  STATE.graphEvents = es;
+}
+
 function nodeColor(state) {
   const map = {
     EXPLORE:'#fbbf24', BUILD:'#38bdf8', ACTIVE:'#4ade80',
@@ -974,17 +1065,48 @@ async function sendExplore() {
   const loadingEl = addChatMsg('loading', '...');
   STATE.chatHistory.push({ role: 'user', content: msg });
 
+  // Stream: hiện text/blocks ngay khi tới, event "done" mới là kết quả cuối
+  let result = null, text = '', summary = '';
+  const partialBlocks = [];
+  const startAnswer = () => {
+    loadingEl.classList.remove('loading');
+    loadingEl.classList.add('assistant');
+  };
+  const onEvent = (event, data) => {
+    if (event === 'done') { result = data; return; }
+    if (event === 'token' && mode !== 'clarify') {
+      startAnswer();
+      text += data.text;
+      loadingEl.textContent = text.split('```')[0];   // ẩn JSON suggested đang về
+    } else if (event === 'summary' || event === 'block') {
+      if (event === 'summary') summary = data.summary;
+      else partialBlocks.push(data);
+      startAnswer();
+      loadingEl.classList.add('has-blocks');
+      loadingEl.textContent = '';
+      const summaryEl = document.createElement('div');
+      summaryEl.className = 'res-summary';
+      summaryEl.textContent = summary;
+      loadingEl.appendChild(summaryEl);
+      loadingEl.appendChild(renderBlockCards(partialBlocks));
+    }
+    else return;
+    document.getElementById('chat-display').scrollTop = 1e9;
+  };
+
   try {
-    const result = await api.post('/api/explore', {
+    await api.stream('/api/explore?stream=1', {
       node_id:      STATE.selectedNodeId,
       container_id: STATE.activeContainerId,
       mode,
       message:      msg,
       history:      STATE.chatHistory.slice(-6),
-    });
+    }, onEvent);
+    if (!result) throw new Error('Mất kết nối khi đang nhận câu trả lời');
 
-    loadingEl.classList.remove('loading');
-    loadingEl.classList.add('assistant');
+    startAnswer();
+    loadingEl.classList.remove('has-blocks');
+    loadingEl.textContent = '';
 
     // Structured block response (clarify mode with JSON)
     if (result.blocks && result.blocks.length) {
@@ -1105,18 +1227,15 @@ async function confirmSuggestedNodes(parentNodeId, suggestedList) {
   if (!toAdd.length) { toast('Không có node nào được chọn'); return; }
 
   let added = 0;
-  for (const s of toAdd) {
-    try {
-      const result = await api.post(`/api/nodes/${nodeId}/confirm-suggested`, {
-        title:         s.title,
-        node_type:     s.node_type,
-        relation_type: s.relation_type,
-        definition:    s.definition || '',
-      });
-      if (result.edge) added++;
-      else { console.warn('Edge not returned for', s.title); added++; }
-    } catch(e) { console.error(e); toast('Lỗi thêm node: ' + e.message); }
-  }
+  try {
+    const result = await api.post(`/api/nodes/${nodeId}/confirm-suggested/batch`, toAdd.map(s => ({
+      title:         s.title,
+      node_type:     s.node_type,
+      relation_type: s.relation_type,
+      definition:    s.definition || '',
+    })));
+    added = (result.nodes || []).length;
+  } catch(e) { console.error(e); toast('Lỗi thêm node: ' + e.message); }
 
   document.getElementById('suggested-area').style.display = 'none';
   STATE.pendingSuggested = [];